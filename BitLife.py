@@ -0,0 +1,323 @@
+import numpy as np
+import hashlib
+from GameOfLife import GameOfLife
+from CellularAutomata import centre_of_mass
+from NeighbourCounter import MOORE
+
+WORD = 64
+_ONE = np.uint64(1)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack(array):
+    """
+    Packs a 2D array of cells into rows of 64 bit words, one bit per cell with cell x at bit x % 64 of word x // 64
+    Args:
+        array: 2D array, any non-zero value is packed as a set bit
+    Returns:
+        (rows, words) array of little-endian uint64
+    """
+    array = np.asarray(array)
+    words = -(-array.shape[1] // WORD)
+    packed = np.packbits(array != 0, axis=1, bitorder='little')
+    padded = np.zeros((array.shape[0], words * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8')
+
+
+def unpack(bits, width):
+    """
+    Inverse of pack
+    Args:
+        bits: (rows, words) array of little-endian uint64
+        width: number of cells in each row
+    Returns:
+        (rows, width) array of 0s and 1s
+    """
+    return np.unpackbits(np.ascontiguousarray(bits, dtype='<u8').view(np.uint8), axis=1, count=width,
+                         bitorder='little')
+
+
+def popcount(bits):
+    """
+    Number of set bits in an array of words
+    """
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_POPCOUNT[np.ascontiguousarray(bits).view(np.uint8)].sum(dtype=np.int64))
+
+
+def _add(a, b):
+    """
+    Bit-sliced addition of two numbers held as lists of bit planes, least significant plane first
+    """
+    out = []
+    carry = None
+    for i in range(max(len(a), len(b))):
+        terms = [t for t in (a[i] if i < len(a) else None, b[i] if i < len(b) else None, carry) if t is not None]
+        if len(terms) == 1:
+            out.append(terms[0])
+            carry = None
+        elif len(terms) == 2:
+            out.append(terms[0] ^ terms[1])
+            carry = terms[0] & terms[1]
+        else:
+            half = terms[0] ^ terms[1]
+            out.append(half ^ terms[2])
+            carry = (terms[0] & terms[1]) | (half & terms[2])
+    if carry is not None:
+        out.append(carry)
+    return out
+
+
+class BitGameOfLife(GameOfLife):
+    """
+    Game of Life with the grid bit-packed into 64 bit words, 64 cells per word. The next generation is computed with
+    bit-sliced adder logic on whole words rather than per cell, keeping the wrap-around boundaries of Grid.
+    Only the Moore neighbourhood is supported.
+    Args:
+        shape - length and width of the grid
+        actors - value used to represent an alive cell, default 1
+        rule - rulestring in B/S notation, default "B3/S23"
+    """
+
+    def __init__(self, shape: tuple, actors=1, rule="B3/S23", seed=None):
+        super().__init__(tuple(shape), actors, rule, seed, np.uint8)
+
+    def _allocate(self):
+        """
+        Creates the empty packed grid in place of a full int array of it
+        """
+        self._words = -(-self._shape[1] // WORD)
+        # number of cells used in the last word of each row and the mask of their bits
+        self._tail = self._shape[1] - WORD * (self._words - 1)
+        self._tail_mask = np.uint64(2 ** self._tail - 1)
+        self._bits = np.zeros((self._shape[0], self._words), dtype='<u8')
+
+    @classmethod
+    def from_grid(cls, grid, rule=None):
+        """
+        Creates a bit-packed copy of a grid
+        Args:
+            grid: Grid or 2D array to copy
+            rule: rulestring to use, defaults to the grid's rule if it has one, otherwise "B3/S23"
+        """
+        if rule is None:
+            rule = getattr(grid, 'rule', "B3/S23")
+        actors = grid.actors[1] if hasattr(grid, 'actors') else 1
+        B = cls(np.shape(grid), actors, rule)
+        B._bits = pack(np.asarray(grid) == actors)
+        return B
+
+    def to_grid(self):
+        """
+        Returns an unpacked GameOfLife copy of the grid
+        """
+        G = GameOfLife(self.shape, self.actors[1], self.rule)
+        G._set_array(self.array)
+        return G
+
+    @property
+    def bits(self):
+        """
+        The packed grid as (rows, words) little-endian uint64
+        """
+        return self._bits
+
+    @property
+    def array(self):
+        return unpack(self._bits, self.shape[1]).astype(self.dtype) * self.actors[1]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __eq__(self, other):
+        return self.array == other
+
+    def _cell(self, index):
+        """
+        Returns the (row, word, bit) of a single cell index, or None if the index is not a single cell
+        """
+        if isinstance(index, tuple) and len(index) == 2 and all(isinstance(i, (int, np.integer)) for i in index):
+            y = int(index[0]) % self.shape[0]
+            x = int(index[1]) % self.shape[1]
+            return y, x // WORD, np.uint64(x % WORD)
+        return None
+
+    def __getitem__(self, index):
+        cell = self._cell(index)
+        if cell is None:
+            return self.array.__getitem__(index)
+        y, w, b = cell
+        return int((self._bits[y, w] >> b) & _ONE) * self.actors[1]
+
+    def __setitem__(self, index, value):
+        cell = self._cell(index)
+        if cell is None:
+            array = self.array
+            array.__setitem__(index, value)
+            self._bits = pack(array == self.actors[1])
+            return
+        y, w, b = cell
+        if value == self.actors[1]:
+            self._bits[y, w] |= _ONE << b
+        else:
+            self._bits[y, w] &= ~(_ONE << b)
+
+    def _set_array(self, array):
+        """
+        Replaces the whole grid, packing it into words
+        """
+        self._bits = pack(np.asarray(array) == self.actors[1])
+
+    def _update_array(self, array):
+        self._set_array(array)
+
+    def _set_cell(self, index, value):
+        self[index] = value
+
+    def recount(self):
+        """
+        Nothing to do, the alive cells are counted from the words when asked
+        """
+
+    def digest(self):
+        return hashlib.blake2b(np.ascontiguousarray(self._bits).tobytes(), digest_size=16).digest()
+
+    def clear(self):
+        self._bits = np.zeros((self.shape[0], self._words), dtype='<u8')
+
+    def randomise(self):
+        """
+        Randomly sets each cell alive or dead with equal probability
+        """
+        raw = np.frombuffer(self.rng.bytes(self.shape[0] * self._words * 8), dtype='<u8')
+        self._bits = raw.reshape(self.shape[0], self._words).copy()
+        self._bits[:, -1] &= self._tail_mask
+
+    def full_randomise(self):
+        """
+        Sets every cell alive, the only state available without 0
+        """
+        self._bits = np.full((self.shape[0], self._words), np.iinfo(np.uint64).max, dtype='<u8')
+        self._bits[:, -1] &= self._tail_mask
+
+    def counts(self):
+        """
+        Returns the number of cells in each state, indexed by state, counted from the words
+        """
+        alive = popcount(self._bits)
+        counts = np.zeros(max(self.actors) + 1, dtype=np.int64)
+        counts[self.actors[0]] += self.size - alive
+        counts[self.actors[1]] += alive
+        return counts
+
+    def count(self, actor):
+        alive = popcount(self._bits)
+        if actor == self.actors[1]:
+            return alive
+        elif actor == self.actors[0]:
+            return self.size - alive
+        return 0
+
+    def _west(self, a):
+        """
+        Each cell takes the value of its neighbour at x - 1
+        """
+        out = a << _ONE
+        out[:, 1:] |= a[:, :-1] >> np.uint64(WORD - 1)
+        out[:, 0] |= (a[:, -1] >> np.uint64(self._tail - 1)) & _ONE
+        out[:, -1] &= self._tail_mask
+        return out
+
+    def _east(self, a):
+        """
+        Each cell takes the value of its neighbour at x + 1
+        """
+        out = a >> _ONE
+        out[:, :-1] |= a[:, 1:] << np.uint64(WORD - 1)
+        out[:, -1] |= (a[:, 0] & _ONE) << np.uint64(self._tail - 1)
+        return out
+
+    def neighbour_planes(self):
+        """
+        Counts the alive Moore neighbours of every cell
+        Returns:
+            list of bit planes of the neighbour count, least significant first
+        """
+        a = self._bits
+        west = self._west(a)
+        east = self._east(a)
+        row = _add(_add([west], [a]), [east])
+        above = [np.roll(p, 1, axis=0) for p in row]
+        below = [np.roll(p, -1, axis=0) for p in row]
+        return _add(_add(above, below), _add([west], [east]))
+
+    @staticmethod
+    def _equals(planes, n):
+        """
+        Bitboard of the cells whose count held in planes is exactly n
+        """
+        eq = None
+        for i, p in enumerate(planes):
+            term = p if (n >> i) & 1 else ~p
+            eq = term if eq is None else eq & term
+        if n >> len(planes):
+            eq &= np.uint64(0)
+        return eq
+
+    def update(self, actor=1, weight=MOORE):
+        """
+        Advances the grid one generation
+        Args:
+            actor: the actor that effect the update, must be the alive actor
+            weight: weighting of neighbours to consider, must be the Moore neighbourhood
+        """
+        if not np.array_equal(weight, MOORE):
+            raise ValueError("BitGameOfLife only supports the Moore neighbourhood")
+        planes = self.neighbour_planes()
+        alive = self._bits
+        born = np.zeros_like(alive)
+        for n in self.birth:
+            born |= self._equals(planes, n)
+        survive = np.zeros_like(alive)
+        for n in self.survive:
+            survive |= self._equals(planes, n)
+        new = (alive & survive) | (~alive & born)
+        new[:, -1] &= self._tail_mask
+        self._bits = new
+
+    def sequential_update(self, actor=1, weight=MOORE, vectorised=False):
+        """
+        Not supported, cells are only updated a whole generation of words at a time. Use to_grid for a grid which
+        can be updated sequentially
+        """
+        raise ValueError("BitGameOfLife only supports synchronous updates, use to_grid for sequential updates")
+
+    def batched_sweep(self, actor=1, weight=MOORE):
+        """
+        Not supported, see sequential_update
+        """
+        raise ValueError("BitGameOfLife only supports synchronous updates, use to_grid for sequential updates")
+
+    def live_cells(self):
+        """
+        Positions of the alive cells, only unpacking words which contain one
+        Returns:
+            tuple of row and column indices
+        """
+        rows, words = np.nonzero(self._bits)
+        cells = np.unpackbits(self._bits[rows, words].view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        k, b = np.nonzero(cells)
+        return rows[k], words[k] * WORD + b
+
+    def CoM(self, actor, on_grid=False, periodic=True):
+        if np.ndim(actor) or actor != self.actors[1]:
+            return super().CoM(actor, on_grid, periodic)
+        # only the live cells are visited rather than the whole grid
+        y, x = self.live_cells()
+        Y, X = self.shape
+        return centre_of_mass(np.bincount(y, minlength=Y), np.bincount(x, minlength=X), self.shape, on_grid, periodic)
@@ -1,11 +1,64 @@
 import numpy as np
+import hashlib
+from collections import deque
 from Grid import Grid
-from matplotlib import pyplot as plt
-from matplotlib.colors import ListedColormap
-from matplotlib import animation
-import scipy.ndimage
-import scipy.signal
-import time
+from FramePipeline import FramePipeline, downsample
+from NeighbourCounter import NeighbourCounter, count_dtype, MOORE, VON_NEUMANN
+
+
+def offset_indices(shape, offsets):
+    """
+    Flat indices of the cells at given offsets from every cell of a grid with wrap-around boundaries
+    Args:
+        shape: shape of the grid
+        offsets: (n, 2) array of row and column offsets
+    Returns:
+        (cells, n) array of flat indices
+    """
+    Y, X = shape
+    y, x = np.indices(shape).reshape(2, -1, 1)
+    return ((y + offsets[:, 0]) % Y) * X + (x + offsets[:, 1]) % X
+
+
+def axis_mean(weights, periodic=True):
+    """
+    Mean position along an axis of the grid from the number of cells at each position. On a periodic axis the
+    positions are placed on a circle and the angle of their mean taken, so a cluster straddling the boundary stays in
+    one piece
+    Args:
+        weights: (..., length) number of cells at each position along the axis
+        periodic: whether the axis wraps around
+    Returns:
+        the mean positions, between 0 and length if periodic. NaN where there are no cells
+    """
+    weights = np.asarray(weights, dtype=float)
+    length = weights.shape[-1]
+    total = weights.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if periodic:
+            z = weights @ np.exp(2j * np.pi * np.arange(length) / length)
+            mean = np.angle(z) * length / (2 * np.pi) % length
+        else:
+            mean = weights @ np.arange(length) / total
+    return np.where(total > 0, mean, np.nan)
+
+
+def centre_of_mass(rows, columns, shape, on_grid=False, periodic=True):
+    """
+    Centre of mass from the number of cells in each row and column
+    Args:
+        rows: (..., Y) number of cells in each row
+        columns: (..., X) number of cells in each column
+        shape: the shape of the grid
+        on_grid: whether or not to round the position to the nearest cell
+        periodic: whether to take the mean on the torus, see axis_mean
+    Returns:
+        (..., 2) row and column of the centre of mass, NaN where there are no cells or -1 if on_grid
+    """
+    com = np.stack([axis_mean(rows, periodic), axis_mean(columns, periodic)], axis=-1)
+    if on_grid:
+        return np.where(np.isnan(com), -1, np.round(np.nan_to_num(com)).astype(int) % shape)
+    return com
 
 
 class CellularAutomata(Grid):
@@ -15,7 +68,66 @@ class CellularAutomata(Grid):
     Args:
         shape - length and width of the grid
         actors - value(s) used to represent active site(s), default 1
+        seed - seed of the random numbers, see Grid
+        dtype - integer type of the states, see Grid
     """
+    # set by models whose rules are deterministic so they can be tabulated by compile_rules
+    compilable = False
+
+    def __init__(self, shape: tuple, actors=1, seed=None, dtype=np.uint8):
+        self._tile_size = None
+        # the actor, weighting and rule table of the last tiled update, see update
+        self._tiled_with = None
+        super().__init__(shape, actors, seed, dtype)
+        self._rule_tables = {}
+        self._sweep_tables = {}
+        self._counters = {}
+        # the grid's own pair of state buffers and the rule table indices, see _apply_table
+        self._buffers = None
+        self._index = None
+
+    def enable_tiles(self, size=16):
+        """
+        Switches update to active-tile mode. The grid is split into square tiles and only tiles which changed in the
+        last step, or border one which did, are recomputed, so sparse or settled grids cost little to update.
+        Only used for models with compilable rules and neighbourhoods no larger than 3x3, other updates fall back
+        to updating the whole grid. Statistics on the last step are kept in tile_stats
+        Args:
+            size: the length and width of a tile
+        """
+        self._tile_size = size
+        tiles = (-(-self.shape[0] // size), -(-self.shape[1] // size))
+        self._active = np.ones(tiles, dtype=bool)
+        self.tile_stats = {'tiles': self._active.size, 'active': self._active.size, 'changed': 0}
+
+    def disable_tiles(self):
+        """
+        Switches update back to updating the whole grid
+        """
+        self._tile_size = None
+
+    def _touch(self):
+        """
+        Marks every tile active after the grid has been changed outside of a tiled update
+        """
+        if self._tile_size is not None:
+            self._active[:] = True
+
+    def _set_array(self, array):
+        super()._set_array(array)
+        self._touch()
+
+    def _update_array(self, array):
+        super()._update_array(array)
+        self._touch()
+
+    def _set_cell(self, index, value):
+        super()._set_cell(index, value)
+        self._touch()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._touch()
 
     def rules(self, c, neighbours):
         """
@@ -28,45 +140,187 @@ class CellularAutomata(Grid):
         """
         return 0
 
+    def sweep_rules(self, c, neighbours, p):
+        """
+        Applies the rule-set to many cells at once, used by the vectorised sequential update. Stochastic models
+        should override this to use the given random numbers rather than drawing their own
+        Args:
+            c: array of cell values
+            neighbours: array of the number of neighbours of each cell
+            p: array of uniform random numbers in [0, 1), one for each cell
+        Return:
+            array of the new values of the cells
+        """
+        return np.vectorize(self.rules, otypes=[self.dtype])(c, neighbours)
+
+    def compile_rules(self, weight):
+        """
+        Tabulates the rule-set for every (state, neighbour count) pair so it can be applied to the whole grid with
+        a single lookup. Tables are cached per maximum neighbour count.
+        Args:
+            weight: weighting of neighbours to consider
+        Returns:
+            array indexed as table[state, neighbours] giving the new state, or None if the rules can't be tabulated
+        """
+        weight = np.asarray(weight)
+        if not self.compilable or not np.issubdtype(weight.dtype, np.integer) or np.any(weight < 0):
+            return None
+        max_neighbours = int(weight.sum())
+        if max_neighbours not in self._rule_tables:
+            table = np.zeros((max(self.actors) + 1, max_neighbours + 1), dtype=self.dtype)
+            for c in self.actors:
+                for n in range(max_neighbours + 1):
+                    table[c, n] = self.rules(c, n)
+            self._rule_tables[max_neighbours] = table
+        return self._rule_tables[max_neighbours]
+
     def get_neighbours_of_value(self, value, weight):
         """
-        finds the number of neighbours of cells using the on-axis and off-axis neighbours
+        finds the number of neighbours of cells using the on-axis and off-axis neighbours. Counting is done by a
+        NeighbourCounter kept for each weighting, which reuses its buffers from one call to the next
         Args:
             values - value representing which actor to consider a neighbour
+            weight - weighting of neighbours to consider
         Return:
-            array of number of neighbours
+            array of number of neighbours, in the smallest type which can hold them. It is overwritten by the next
+            count with the same weighting, so copy it to keep it
         """
-        copy = np.copy(self.array)
-        copy = np.where(copy == value, 1, 0)
-        conv = scipy.ndimage.filters.convolve(copy, weight, mode='wrap')
-        return conv
+        weight = np.asarray(weight)
+        key = (weight.shape, weight.dtype.str, weight.tobytes())
+        if key not in self._counters:
+            self._counters[key] = NeighbourCounter(self.shape, weight)
+        return self._counters[key].count(self.array, value)
 
-    def update(self, actor, weight=np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]])):
+    def update(self, actor, weight=MOORE):
         """
-        Updates the grid using the chosen method for neighbours
+        Updates the grid using the chosen method for neighbours. Models with compilable rules are updated with a
+        lookup into their rule table, otherwise the rules are applied cell by cell. Compiled updates write into the
+        grid's second buffer and swap, so array is overwritten two updates later, copy it to keep it
 
         Args:
             actor: the actor that effect the update
             weight: weighting of neighbours to consider
         """
+        table = self.compile_rules(weight)
+        if table is not None and self._tile_size is not None and np.shape(weight) == (3, 3):
+            weight = np.asarray(weight)
+            # tiles settled under another actor, weighting or rule may not be settled under this one
+            tiling = (actor, weight.dtype.str, weight.tobytes(), table.tobytes())
+            if tiling != self._tiled_with:
+                self._touch()
+                self._tiled_with = tiling
+            self._tiled_update(actor, weight, table)
+            return
         neighbours = self.get_neighbours_of_value(actor, weight)
-        rules_vec = np.vectorize(self.rules)
-        self._array = rules_vec(self.array, neighbours)
+        if table is None:
+            rules_vec = np.vectorize(self.rules, otypes=[self.dtype])
+            self._update_array(rules_vec(self.array, neighbours))
+        else:
+            self._apply_table(table, neighbours)
 
-    def sequential_update(self, actor, weight=np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]])):
+    def _apply_table(self, table, neighbours):
+        """
+        Replaces the grid with table[grid, neighbours] without allocating anything the size of the grid. The rule
+        table is gathered into whichever of the grid's two buffers isn't the current state and the buffers swapped.
+        The counts follow from how many cells took each (state, neighbours) entry of the table
+        Args:
+            table: the compiled rule table
+            neighbours: number of neighbours of each cell
+        """
+        if self._buffers is None:
+            self._buffers = (np.empty(self.shape, dtype=self.dtype), np.empty(self.shape, dtype=self.dtype))
+            self._index = np.empty(self.shape, dtype=np.intp)
+        new = self._buffers[1] if self._array is self._buffers[0] else self._buffers[0]
+        index = self._index
+        np.multiply(self._array, table.shape[1], out=index, dtype=np.intp)
+        index += neighbours
+        # clip rather than raise, which buffers the output, the indices are always in range
+        np.take(table.ravel(), index, out=new, mode='clip')
+        entries = np.bincount(index.ravel(), minlength=table.size)
+        counts = np.bincount(table.ravel(), weights=entries, minlength=len(self._counts))
+        self._counts = counts.astype(self._counts.dtype)
+        self._array = new
+        self._touch()
+
+    def _tiled_update(self, actor, weight, table):
+        """
+        Updates only the active tiles, see enable_tiles
+        Args:
+            actor: the actor that effect the update
+            weight: 3x3 weighting of neighbours to consider
+            table: the compiled rule table
+        """
+        T = self._tile_size
+        Y, X = self.shape
+        ty, tx = np.nonzero(self._active)
+        self.tile_stats = {'tiles': self._active.size, 'active': len(ty), 'changed': 0}
+        if len(ty) == 0:
+            return
+        # gather every active tile with a one cell border, wrapping around the grid
+        r = np.arange(-1, T + 1)
+        rows = (ty[:, None] * T + r) % Y
+        cols = (tx[:, None] * T + r) % X
+        block = self._array[rows[:, :, None], cols[:, None, :]]
+        dtype = count_dtype(weight)
+        weight = weight.astype(dtype)
+        mask = (block == actor).astype(dtype)
+        neighbours = np.zeros((len(ty), T, T), dtype=dtype)
+        for (dy, dx), w in zip(np.argwhere(weight != 0), weight[weight != 0]):
+            neighbours += w * mask[:, dy:dy + T, dx:dx + T]
+        old = block[:, 1:-1, 1:-1]
+        new = table[old, neighbours]
+        # tiles at the edge of the grid can overhang it, those cells are copies of cells across the boundary
+        inside_rows = ty[:, None] * T + np.arange(T) < Y
+        inside_cols = tx[:, None] * T + np.arange(T) < X
+        inside = inside_rows[:, :, None] & inside_cols[:, None, :]
+        changed = (new != old) & inside
+        k, i, j = np.nonzero(changed)
+        ys = ty[k] * T + i
+        xs = tx[k] * T + j
+        self._shift_counts(self._array[ys, xs], new[k, i, j])
+        self._array[ys, xs] = new[k, i, j]
+        # the next step only needs the tiles which changed and their neighbours
+        changed_tiles = np.zeros_like(self._active)
+        changed_tiles[ty[changed.any(axis=(1, 2))], tx[changed.any(axis=(1, 2))]] = True
+        active = changed_tiles.copy()
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                active |= np.roll(changed_tiles, (dy, dx), axis=(0, 1))
+        self._active = active
+        self.tile_stats['changed'] = int(changed_tiles.sum())
+
+    def parallel(self, actor, weight=MOORE, workers=None):
+        """
+        Creates a multi-process synchronous update of a copy of the grid, with the grid split into strips in shared
+        memory. Only available for models with compilable rules
+        Args:
+            actor: the actor that effect the update
+            weight: 3x3 weighting of neighbours to consider
+            workers: number of worker processes, defaults to the number of cores
+        Returns:
+            ParallelUpdate holding the grid, which should be closed when finished with
+        """
+        from ParallelUpdate import ParallelUpdate
+        return ParallelUpdate.from_automaton(self, actor, weight, workers)
+
+    def sequential_update(self, actor, weight=VON_NEUMANN, vectorised=False):
         """
         Sequentially updates the grid by randomly choosing a cell and applying the update rule.
         Repeats this process N times
         Args:
             actor: the actor that effect the update
             weight: weighting of neighbours to consider
+            vectorised: whether to apply the updates in conflict-free batches, see batched_sweep
         """
+        if vectorised:
+            self.batched_sweep(actor, weight)
+            return
         X = self.shape[1]
         Y = self.shape[0]
-        for _ in range(X * Y):
-            # randomly choose a point on the grid
-            x = np.random.randint(X)
-            y = np.random.randint(Y)
+        # the points of the whole sweep are drawn at once
+        xs = self.rng.integers(X, size=X * Y).tolist()
+        ys = self.rng.integers(Y, size=X * Y).tolist()
+        for x, y in zip(xs, ys):
             # get the neighbours of the cell
             i_x = [(x-1) % X, x, (x+1) % X]
             i_y = [(y-1) % Y, y, (y+1) % Y]
@@ -74,9 +328,67 @@ class CellularAutomata(Grid):
             # remove any irrelevant neighbours and count
             neighbours = neighbours*weight
             neighbours = sum(neighbours[neighbours == actor])
-            self._array[x, y] = self.rules(self.array[x, y], neighbours)
+            self._set_cell((x, y), self.rules(self.array[x, y], neighbours))
 
-    def find_equilibrium(self, actor, effector, weight=np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]]), steps=10, tol=1):
+    def batched_sweep(self, actor, weight=VON_NEUMANN):
+        """
+        Performs one random sequential sweep of N updates with all the sites and random numbers drawn up front.
+        The sequence of sites is taken in windows, and each site is placed in the batch after the latest earlier
+        site it conflicts with (one reads the cell the other writes). Sites within a batch don't interact and
+        conflicting sites stay in order, so applying the batches at once with sweep_rules gives the same result as
+        applying the updates one at a time
+        Args:
+            actor: the actor that effect the update
+            weight: weighting of neighbours to consider, centred on the cell
+        """
+        weight = np.asarray(weight)
+        N = self.size
+        sites = self.rng.integers(N, size=N)
+        p = self.rng.random(N)
+        neighbours, weights, footprint = self.sweep_tables(weight)
+        self._array = np.ascontiguousarray(self._array)
+        flat = self._array.reshape(-1)
+        window = min(N, 64)
+        earlier = np.arange(window)[:, None] < np.arange(window)[None, :]
+        for start in range(0, N, window):
+            s = sites[start:start + window]
+            # clash[i, j] if site i comes before site j and they conflict
+            clash = (footprint[s][:, :, None] == s[None, None, :]).any(axis=1) & earlier[:len(s), :len(s)]
+            batch = np.zeros(len(s), dtype=int)
+            while True:
+                new = np.where(clash, batch[:, None] + 1, 0).max(axis=0)
+                if np.array_equal(new, batch):
+                    break
+                batch = new
+            for b in range(batch.max() + 1):
+                chosen = batch == b
+                cells = s[chosen]
+                n = (flat[neighbours[cells]] == actor) @ weights
+                old = flat[cells]
+                flat[cells] = self.sweep_rules(old, n, p[start:start + window][chosen])
+                self._shift_counts(old, flat[cells])
+
+    def sweep_tables(self, weight):
+        """
+        Flat index tables used by batched_sweep, cached per weight
+        Returns:
+            the flat indices of the neighbours of every cell, the weight of each neighbour, and the flat indices
+            of every cell whose update conflicts with each cell's
+        """
+        key = (weight.shape, weight.tobytes())
+        if key not in self._sweep_tables:
+            ry = weight.shape[0] // 2
+            rx = weight.shape[1] // 2
+            neighbours = offset_indices(self.shape, np.argwhere(weight != 0) - [ry, rx])
+            # two sites conflict if either one reads the cell the other writes
+            conflict = (weight != 0) | (weight[::-1, ::-1] != 0)
+            conflict[ry, rx] = True
+            footprint = offset_indices(self.shape, np.argwhere(conflict) - [ry, rx])
+            self._sweep_tables[key] = (neighbours, weight[weight != 0], footprint)
+        return self._sweep_tables[key]
+
+    def find_equilibrium(self, actor, effector, weight=MOORE, steps=10, tol=1,
+                         exact=False):
         """
         Updates the cells n times until it reaches equilibrium and returns
         the number of steps required to do so
@@ -86,9 +398,14 @@ class CellularAutomata(Grid):
             weight: weighting of a neighbour to consider
             steps: number of updates to check
             tol: the degree to which the number of active cells must be the same
+            exact: whether to find the exact step the grid reaches a fixed point or cycle with find_cycle, rather
+                   than waiting for the number of active cells to settle. actor, steps and tol are then unused
         Returns:
-            The number of steps required to reach equilibrium
+            The number of steps required to reach equilibrium, None if exact and no cycle was found
         """
+        if exact:
+            cycle = self.find_cycle(effector, weight)
+            return None if cycle is None else cycle[0]
         num_active = [self.count(actor)]
         self.update(effector, weight)
         num_active.append(self.count(actor))
@@ -101,39 +418,123 @@ class CellularAutomata(Grid):
             count += 1
         return count
 
-    def CoM(self, actor: int, on_grid=False):
+    def digest(self):
         """
-        Returns the position of the centre of mass of a specific actor
+        128 bit hash identifying the state of the grid, equal grids always have equal digests and the chance of
+        unequal grids sharing one is negligible
+        """
+        return hashlib.blake2b(np.ascontiguousarray(self._array).tobytes(), digest_size=16).digest()
+
+    def find_cycle(self, effector, weight=MOORE, history=1024,
+                   max_steps=100_000):
+        """
+        Updates the grid until it returns to a state it has been in before, found exactly by keeping the digest of
+        the grid at each generation. Finds fixed points and periodic cycles such as blinkers or gliders on a torus
         Args:
-            actor: the value of which actor to monitor
+            effector: actor which causes changes
+            weight: weighting of a neighbour to consider
+            history: number of past generations to remember, cycles with longer periods are not found
+            max_steps: most generations to update for
+        Returns:
+            the first generation of the cycle and its period (1 for a fixed point), or None if no cycle was found
+            within max_steps. The grid is left one period after the start of the cycle
+        """
+        seen = {}
+        order = deque()
+        for t in range(max_steps + 1):
+            d = self.digest()
+            if d in seen:
+                return seen[d], t - seen[d]
+            seen[d] = t
+            order.append(d)
+            if len(order) > history:
+                del seen[order.popleft()]
+            if t < max_steps:
+                self.update(effector, weight)
+        return None
+
+    def CoM(self, actor, on_grid=False, periodic=True):
+        """
+        Returns the position of the centre of mass of one or more actors, found for all of them in one pass over the
+        grid by counting the cells of every value in each row and column
+        Args:
+            actor: the value of which actor to monitor, or a sequence of them
             on_grid: whether or not to round the position to the nearest int
+            periodic: whether to take the mean on the torus so an actor straddling the boundary stays in one piece,
+                      rather than the plain mean of the positions
         Returns:
-            the position of the centre of mass
-        """
-        # find all the actors on the grid
-        x = np.where(self == actor)
-        A = np.empty(len(x[0]), dtype=object)
-        for i, v in enumerate(x[0]):
-            A[i] = np.array([v, x[1][i]])
-        # find the number of actors
-        count = self.count(actor)
-        if on_grid:
-            return np.round(sum(A / count)).astype(int)
-        else:
-            return sum(A / count)
+            the position of the centre of mass, or an (actors, 2) array of them given a sequence. NaN for an actor
+            with no cells, or -1 if on_grid
+        """
+        actor = np.asarray(actor)
+        # the states are widened so the combined (state, row) indices don't overflow
+        array = np.asarray(self.array, dtype=np.intp)
+        Y, X = self.shape
+        values = max(int(array.max()), int(actor.max())) + 1
+        rows = np.bincount((array * Y + np.arange(Y)[:, None]).ravel(), minlength=values * Y).reshape(values, Y)
+        columns = np.bincount((array * X + np.arange(X)).ravel(), minlength=values * X).reshape(values, X)
+        return centre_of_mass(rows[actor], columns[actor], self.shape, on_grid, periodic)
+
+    def _method(self, update_method, replay=None):
+        """
+        The function advancing the grid for an animation, loading the frames of a Trajectory in turn if replaying
+        """
+        if replay is None:
+            return self.update if update_method == 'c' else self.sequential_update
+        frames = replay.frames()
+        self._set_array(np.array(next(frames)))
+        return lambda effector: self._update_array(np.array(next(frames)))
 
-    def animate(self, CELL_COLOUR, BG_COLOUR, steps, title, patches, effector, update_method='c'):
+    @staticmethod
+    def _play(ax, pipeline, draw):
         """
-        using matplotlib, animate the cellular automata over a given number of steps
+        Shows the frames of a pipeline as they are produced, redrawing only the animated artists with blitting and
+        showing the frame rate and simulation speed in the corner
+        Args:
+            ax: axes to draw on
+            pipeline: FramePipeline producing the frames
+            draw: function of a frame updating the artists, returning them
+        """
+        from matplotlib import pyplot as plt
+        from matplotlib import animation
+        readout = ax.text(0.01, 0.99, '', transform=ax.transAxes, va='top', fontsize='small', animated=True,
+                          bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+        artists = []
+
+        def render(i):
+            frame = pipeline.get()
+            if frame is not None:
+                artists[:] = draw(frame)
+            readout.set_text(pipeline.readout())
+            if pipeline.finished:
+                a.event_source.stop()
+            return (*artists, readout)
+
+        a = animation.FuncAnimation(ax.figure, render, interval=1, blit=True, cache_frame_data=False)
+        with pipeline:
+            plt.show()
+
+    def animate(self, CELL_COLOUR, BG_COLOUR, steps, title, patches, effector, update_method='c', steps_per_frame=1,
+                downsample_by=1, buffer=4, replay=None):
+        """
+        using matplotlib, animate the cellular automata over a given number of steps. The automaton is advanced in a
+        background thread, see FramePipeline, so the display only redraws the newest frame it has
         Args:
             CELL_COLOUR: colours for each type of active cell
             BG_COLOUR: colour for the background/dead cells
-            steps: number of frames to animate for
+            steps: number of steps to animate for
             title: title on the graph
             patches: name of actor and colour to display in a legend
             effector: the actor that causes updates
             update_method: the method used to update the display 'c' concurrent 's' sequential.
+            steps_per_frame: number of steps between frames
+            downsample_by: keep every n-th cell along each axis of a frame, for large grids
+            buffer: number of frames waiting to be drawn before the oldest are dropped
+            replay: Trajectory to show the recorded frames of rather than running the model, at most steps of them
         """
+        # matplotlib is only imported for display so measurements can run without it
+        from matplotlib import pyplot as plt
+        from matplotlib.colors import ListedColormap
         if type(CELL_COLOUR) == list:
             c = [BG_COLOUR]
             c.extend(CELL_COLOUR)
@@ -145,52 +546,61 @@ class CellularAutomata(Grid):
         ax.axes.yaxis.set_visible(False)
         ax.set_title(title)
         fig.legend(handles=patches)
-        im = ax.imshow(self, cmap=cols)
+        method = self._method(update_method, replay)
+        if replay is not None:
+            steps = min(steps, len(replay) - 1)
+        im = ax.imshow(downsample(self.array, downsample_by), cmap=cols, animated=True)
         fig.colorbar(im)
-        if update_method == 'c':
-            method = self.update
-        else:
-            method = self.sequential_update
 
-        def animate(i):
-            method(effector)
-            im.set_array(self)
+        def draw(frame):
+            im.set_array(frame)
             return im,
 
-        a = animation.FuncAnimation(fig, animate, frames=steps, interval=1)
-        plt.show()
+        pipeline = FramePipeline(lambda: method(effector), lambda: downsample(self.array, downsample_by),
+                                 -(-steps // steps_per_frame), steps_per_frame, buffer)
+        self._play(ax, pipeline, draw)
 
-    def animateCoM(self, CELL_COLOURS, BG_COLOUR, steps, title, patches, actor, effector, update_method='c'):
+    def animateCoM(self, CELL_COLOURS, BG_COLOUR, steps, title, patches, actor, effector, update_method='c',
+                   steps_per_frame=1, buffer=4, replay=None):
         """
-        using matplotlib, animate the Centre of mass of the automata over a given number of steps
+        using matplotlib, animate the Centre of mass of the automata over a given number of steps. The automaton is
+        advanced in a background thread, see FramePipeline, which only hands over the centre of mass
         Args:
             CELL_COLOURS: colours for each type of active cell
             BG_COLOUR: colour for the background/dead cells
-            steps: number of frames to animate for
+            steps: number of steps to animate for
             title: title on the graph
             actor: actor to monitor CoM
             effector: actor that causes updates
             update_method: the method used to update the display 'c' concurrent 's' sequential.
+            steps_per_frame: number of steps between frames
+            buffer: number of frames waiting to be drawn before the oldest are dropped
+            replay: Trajectory to follow the recorded frames of rather than running the model, see animate
         """
+        from matplotlib import pyplot as plt
+        from matplotlib.colors import ListedColormap
         cols = ListedColormap([BG_COLOUR, CELL_COLOURS])
         fig, ax = plt.subplots()
         ax.axes.xaxis.set_visible(False)
         ax.axes.yaxis.set_visible(False)
         ax.set_title(title)
-        im = ax.imshow(self, cmap=cols)
+        # one image reused for every frame, only the cell under the centre of mass is set
+        canvas = np.zeros(self.shape)
+        im = ax.imshow(canvas, cmap=cols, vmin=0, vmax=1, animated=True)
         fig.legend(handles=patches)
-        if update_method == 'c':
-            method = self.update
-        else:
-            method = self.sequential_update
-
-        def animate(i):
-            method(effector)
-            X = tuple(self.CoM(actor, True))
-            new = self.__class__(self.shape, self._actors[1:])
-            new[X] = 1
-            im.set_array(new)
+        method = self._method(update_method, replay)
+        if replay is not None:
+            steps = min(steps, len(replay) - 1)
+        shown = [(0, 0)]
+
+        def draw(frame):
+            canvas[shown[0]] = 0
+            if np.all(np.isfinite(frame)):
+                shown[0] = tuple(np.round(frame).astype(int) % self.shape)
+                canvas[shown[0]] = 1
+            im.set_array(canvas)
             return im,
 
-        a = animation.FuncAnimation(fig, animate, frames=steps, interval=1)
-        plt.show()
+        pipeline = FramePipeline(lambda: method(effector), lambda: self.CoM(actor), -(-steps // steps_per_frame),
+                                 steps_per_frame, buffer)
+        self._play(ax, pipeline, draw)
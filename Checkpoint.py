@@ -0,0 +1,126 @@
+import numpy as np
+import json
+import os
+import shutil
+import tempfile
+
+# mode of new files under the process's umask, as open() would create them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def atomic_write(path, data):
+    """
+    Writes a file so that it is either fully written or left untouched, by writing to a temporary file in the
+    same directory and renaming it over the destination. The file gets the permissions open() would give a new file
+    under the umask
+    Args:
+        path: file to write
+        data: str or bytes to write, or a function writing the contents to the binary file it is given
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w' if isinstance(data, str) else 'wb') as outfile:
+            if callable(data):
+                data(outfile)
+            else:
+                outfile.write(data)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+            # temporary files are created readable only by their owner
+            os.fchmod(outfile.fileno(), FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _name(key):
+    return '_'.join(str(k) if isinstance(k, (int, np.integer)) else str(float(k)) for k in key) + '.npy'
+
+
+def _key(name):
+    parts = name[:-len('.npy')].split('_')
+    return tuple(int(p) if p.lstrip('-').isdigit() else float(p) for p in parts)
+
+
+class Checkpoint:
+    """
+    Directory of completed results of a parameter sweep, one file per parameter point, so an interrupted sweep can
+    be resumed by only running the points which are missing. Each result is written atomically so a crash can never
+    leave a partial file behind. The root seed of the sweep is recorded with it, see seed, and the directory should
+    be cleared once the sweep's output is written so a later sweep starts afresh
+    Args:
+        directory: where to keep the results, created if it doesn't exist
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, _name(key))
+
+    def completed(self):
+        """
+        Returns the set of keys which have a saved result
+        """
+        return {_key(f) for f in os.listdir(self.directory) if f.endswith('.npy') and not f.startswith('.')}
+
+    def seed(self, seed=None):
+        """
+        The root seed of the sweep, recorded the first time it is asked for so a resumed sweep carries on with the
+        same random numbers
+        Args:
+            seed: the seed asked for, anything accepted by np.random.SeedSequence, or None for the recorded seed if
+                  there is one and fresh entropy otherwise
+        Returns:
+            the SeedSequence to seed the sweep from
+        Raises:
+            ValueError if a different seed was recorded, as mixing results from two seeds can't be repeated
+        """
+        root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        requested = {'entropy': root.entropy, 'spawn_key': list(root.spawn_key)}
+        path = os.path.join(self.directory, 'seed.json')
+        if os.path.isfile(path):
+            with open(path) as infile:
+                recorded = json.load(infile)
+            if seed is not None and recorded != requested:
+                raise ValueError(f"{self.directory} holds an interrupted sweep with seed {recorded['entropy']}, "
+                                 f"resume it with that seed or none, or delete it to start again")
+            return np.random.SeedSequence(recorded['entropy'], spawn_key=recorded['spawn_key'])
+        atomic_write(path, json.dumps(requested))
+        return root
+
+    def clear(self):
+        """
+        Deletes the checkpoint, once the sweep's output has been written
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def save(self, key, result):
+        """
+        Saves the result of one parameter point
+        Args:
+            key: tuple of numbers identifying the point e.g. (p1, p3)
+            result: array of results
+        """
+        atomic_write(self._path(key), lambda outfile: np.save(outfile, np.asarray(result)))
+
+    def load(self, key):
+        """
+        Returns the saved result of one parameter point
+        """
+        return np.load(self._path(key))
+
+    def missing(self, keys):
+        """
+        Returns the keys from a list which don't have a saved result yet, in order
+        """
+        done = self.completed()
+        return [k for k in keys if _key(_name(k)) not in done]
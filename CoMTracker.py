@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class CoMTracker:
+    """
+    Follows the centre of mass of one or more actors over many steps of an automaton on a torus. Each position is
+    unwrapped across the periodic boundaries as it is recorded, by taking the shortest displacement from the one
+    before, so the trajectory and velocity are continuous however many times the actor crosses the grid. Positions
+    are kept in a preallocated array rather than a list, so each step costs the same however long the run.
+    Anything moving more than half the grid between records can't be followed
+    Args:
+        shape: the shape of the grid
+        keep: whether to keep the whole trajectory, or only the first and latest positions
+        capacity: number of positions to allocate space for at first, doubled whenever it is full
+    """
+
+    def __init__(self, shape, keep=True, capacity=1024):
+        self.shape = np.array(shape)
+        self.keep = keep
+        self._capacity = capacity
+        self._positions = None
+        self._first = None
+        self._last = None
+        self._wrapped = None
+        self._steps = 0
+
+    @property
+    def steps(self):
+        """
+        number of positions recorded
+        """
+        return self._steps
+
+    def record(self, position):
+        """
+        Records the next position
+        Args:
+            position: (..., 2) centre of mass on the grid, e.g. from CellularAutomata.CoM
+        """
+        position = np.asarray(position, dtype=float)
+        if self._steps == 0:
+            unwrapped = position
+            self._first = position
+        else:
+            unwrapped = self._last + (position - self._wrapped + self.shape / 2) % self.shape - self.shape / 2
+        if self.keep:
+            if self._positions is None:
+                self._positions = np.empty((self._capacity,) + position.shape)
+            elif self._steps == len(self._positions):
+                self._positions = np.concatenate([self._positions, np.empty_like(self._positions)])
+            self._positions[self._steps] = unwrapped
+        self._wrapped = position
+        self._last = unwrapped
+        self._steps += 1
+
+    def track(self, automaton, actor):
+        """
+        Records the centre of mass of an actor in the current state of an automaton
+        Args:
+            automaton: the CellularAutomata to measure
+            actor: the value of the actor, or a sequence of them
+        Returns:
+            the centre of mass on the grid
+        """
+        position = automaton.CoM(actor)
+        self.record(position)
+        return position
+
+    @property
+    def trajectory(self):
+        """
+        (steps, ..., 2) unwrapped positions recorded, only if keep
+        """
+        if not self.keep:
+            raise ValueError("The trajectory is only kept if the tracker was created with keep=True")
+        if self._positions is None:
+            return np.empty((0, 2))
+        return self._positions[:self._steps]
+
+    @property
+    def positions(self):
+        """
+        (steps, ..., 2) recorded positions on the grid, only if keep
+        """
+        return self.trajectory % self.shape
+
+    @property
+    def displacement(self):
+        """
+        displacement between the first and latest positions
+        """
+        if self._steps == 0:
+            return np.zeros(2)
+        return self._last - self._first
+
+    @property
+    def velocity(self):
+        """
+        mean velocity in cells per step
+        """
+        if self._steps < 2:
+            return np.zeros_like(self.displacement)
+        return self.displacement / (self._steps - 1)
+
+    @property
+    def speed(self):
+        """
+        mean speed in cells per step
+        """
+        return np.linalg.norm(self.velocity, axis=-1)
@@ -0,0 +1,351 @@
+import numpy as np
+import hashlib
+from collections import deque
+from CellularAutomata import offset_indices
+from GameOfLife import parse_rulestring
+from SIRS import is_stationary, batch_error, MIN_MEASUREMENTS
+from NeighbourCounter import VON_NEUMANN
+
+
+class SIRSEnsemble:
+    """
+    Many independent replicas of the SIRS model held in one (replicas, Y, X) array, each with its own p1, p2 and p3.
+    A random sequential sweep advances every replica at once: each of the N updates in a sweep picks one site in
+    every replica and applies the rules to all of them together. Replicas which reach the absorbing state (no
+    infected) are masked out and no longer updated.
+    Args:
+        shape: the size of the grid of each replica
+        p1: Probability S->I, one for each replica or a single value for all of them
+        p2: Probability I->R, as p1
+        p3: Probability R->S, as p1
+        susceptible: value to denote susceptible
+        infected: value to denote infected
+        immune: value to denote immune
+        seed: seed of the random numbers, see Grid
+
+        recovered will always be denoted by a 0
+    """
+
+    def __init__(self, shape: tuple, p1, p2, p3, susceptible=1, infected=2, immune=3, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self._shape = tuple(shape)
+        p1, p2, p3 = np.broadcast_arrays(*(np.atleast_1d(np.asarray(p, dtype=float)) for p in (p1, p2, p3)))
+        self.p1 = p1.copy()
+        self.p2 = p2.copy()
+        self.p3 = p3.copy()
+        self._actors = [0, susceptible, infected, immune]
+        self._array = np.zeros((len(self.p1),) + self._shape, dtype=np.uint8)
+        self.active = np.ones(len(self.p1), dtype=bool)
+        offsets = np.argwhere(VON_NEUMANN != 0) - 1
+        self._neighbours = offset_indices(self._shape, offsets)
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def actors(self):
+        return self._actors
+
+    @property
+    def replicas(self):
+        return len(self.p1)
+
+    @property
+    def size(self):
+        """
+        number of cells in each replica
+        """
+        return self.shape[0] * self.shape[1]
+
+    @property
+    def array(self):
+        return self._array
+
+    def randomise(self, immunised: float):
+        """
+        Args:
+            immunised: fraction of immunised people in each replica
+        """
+        x = (1 - immunised) / 3
+        self._array = self.rng.choice(np.asarray(self.actors, dtype=np.uint8), self._array.shape,
+                                      p=[x, x, x, immunised])
+        self.active[:] = True
+
+    def count(self, actor):
+        """
+        Returns the number of given actor in each replica
+        """
+        return np.count_nonzero(self._array == actor, axis=(1, 2))
+
+    def census(self):
+        """
+        Returns the number of every state in each replica as a (replicas, states) array indexed by the value of the
+        state, counted with one bincount over the whole ensemble
+        """
+        states = max(self.actors) + 1
+        offsets = states * np.arange(self.replicas, dtype=np.intp)[:, None, None]
+        counts = np.bincount((self._array + offsets).ravel(), minlength=states * self.replicas)
+        return counts.reshape(self.replicas, states)
+
+    def sweep_rules(self, c, neighbours, p, replicas):
+        """
+        Applies the SIRS rules to one cell in each of a set of replicas
+        Args:
+            c: the value of the cell in each replica
+            neighbours: the number of infected neighbours of each cell
+            p: uniform random number for each cell
+            replicas: the replica each cell belongs to
+        Returns:
+            the new values of the cells
+        """
+        recovered, susceptible, infected, immune = self.actors
+        new = c.copy()
+        new[(c == susceptible) & (neighbours > 0) & (p <= self.p1[replicas])] = infected
+        new[(c == infected) & (p <= self.p2[replicas])] = recovered
+        new[(c == recovered) & (p <= self.p3[replicas])] = susceptible
+        return new
+
+    def sweep(self):
+        """
+        Performs one random sequential sweep of N updates on every active replica
+        """
+        replicas = np.flatnonzero(self.active)
+        if len(replicas) == 0:
+            return
+        N = self.size
+        sites = self.rng.integers(N, size=(N, len(replicas)))
+        p = self.rng.random((N, len(replicas)))
+        self._array = np.ascontiguousarray(self._array)
+        flat = self._array.reshape(-1)
+        # flat index of each chosen site and of its neighbours across the whole ensemble
+        cells = sites + replicas * N
+        neighbours = self._neighbours[sites] + (replicas * N)[:, None]
+        infected = self.actors[2]
+        for c, nb, u in zip(cells, neighbours, p):
+            n = np.count_nonzero(flat[nb] == infected, axis=1)
+            flat[c] = self.sweep_rules(flat[c], n, u, replicas)
+
+    def measure_infections(self, equilibrate_sweeps: int, measurements: int, adaptive=False, target_error=1e-3,
+                           window=20, census=False):
+        """
+        Args:
+            equilibrate_sweeps: the number of sweeps to perform before taking measurements, the most performed if
+                                adaptive
+            measurements: the number of measurements to make, the most made if adaptive
+            adaptive: whether each replica stops equilibrating once its number of infected is stationary, and stops
+                      measuring once the standard error of its mean infected fraction reaches target_error
+            target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+            window: number of sweeps between checks when adaptive
+            census: whether to count every state at each sweep rather than only the infected
+
+        Returns: the number of infected in each replica for each measurement, the p1 and p3 of each replica, and the
+                 (replicas, 2) number of equilibration and measurement sweeps performed by each replica. Measurements
+                 after a replica is absorbed are 0 and those after it stopped early are NaN. With census, also the
+                 (replicas, measurements, states) number of each state, NaN after a replica is absorbed or stopped
+        """
+        infected = self.actors[2]
+        history = np.zeros((self.replicas, equilibrate_sweeps))
+        series = np.zeros((self.replicas, measurements))
+        states = np.full((self.replicas, measurements, max(self.actors) + 1), np.nan) if census else None
+        sweeps = np.zeros((self.replicas, 2), dtype=int)
+        measuring = np.full(self.replicas, equilibrate_sweeps == 0)
+        self.active &= sweeps[:, 1] < measurements
+        while self.active.any():
+            self.sweep()
+            if census:
+                everything = self.census()
+                counts = everything[:, infected]
+            else:
+                counts = self.count(infected)
+            eq = np.flatnonzero(self.active & ~measuring)
+            history[eq, sweeps[eq, 0]] = counts[eq]
+            sweeps[eq, 0] += 1
+            m = np.flatnonzero(self.active & measuring)
+            series[m, sweeps[m, 1]] = counts[m]
+            if census:
+                states[m, sweeps[m, 1]] = everything[m]
+            sweeps[m, 1] += 1
+            # once a replica has no infected it can never have any again
+            self.active &= counts > 0
+            if adaptive:
+                n = sweeps[eq, 0]
+                check = eq[self.active[eq] & (n % window == 0) & (n >= 2 * window)]
+                if len(check):
+                    last = sweeps[check, 0, None] + np.arange(-2 * window, 0)
+                    measuring[check] = is_stationary(history[check[:, None], last], window)
+                n = sweeps[m, 1]
+                for r in m[self.active[m] & (n % window == 0) & (n >= MIN_MEASUREMENTS)]:
+                    if batch_error(series[r, :sweeps[r, 1]]) / self.size <= target_error:
+                        series[r, sweeps[r, 1]:] = np.nan
+                        self.active[r] = False
+            measuring[eq] |= sweeps[eq, 0] >= equilibrate_sweeps
+            self.active &= sweeps[:, 1] < measurements
+        if census:
+            return series, self.p1, self.p3, sweeps, states
+        return series, self.p1, self.p3, sweeps
+
+
+class GameOfLifeEnsemble:
+    """
+    Many independent Game of Life boards held in one (boards, Y, X) array. Every board is advanced at once with one
+    neighbour count and one rule lookup for the whole stack, rather than one automaton per board. Boards which have
+    reached equilibrium are dropped from the stack so the rest are updated on their own.
+    Args:
+        shape: the size of each board
+        boards: number of boards
+        rule: rulestring in B/S notation, default "B3/S23"
+        seed: seed of the random numbers, see Grid
+    """
+
+    def __init__(self, shape: tuple, boards: int, rule="B3/S23", seed=None):
+        self.rng = np.random.default_rng(seed)
+        self._shape = tuple(shape)
+        self._array = np.zeros((boards,) + self._shape, dtype=np.uint8)
+        birth, survive = parse_rulestring(rule)
+        # new state indexed as table[state, neighbours]
+        self._table = np.zeros((2, 9), dtype=np.uint8)
+        self._table[0, list(birth)] = 1
+        self._table[1, list(survive)] = 1
+        self.rule = rule
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def boards(self):
+        return len(self._array)
+
+    @property
+    def array(self):
+        return self._array
+
+    @array.setter
+    def array(self, array):
+        array = np.asarray(array)
+        if array.shape[1:] != self.shape:
+            raise ValueError(f"Expected boards of shape {self.shape}, got {array.shape[1:]}")
+        self._array = (array != 0).astype(np.uint8)
+
+    def randomise(self):
+        """
+        Sets every cell of every board dead or alive with equal probability
+        """
+        self._array = self.rng.integers(2, size=self._array.shape, dtype=np.uint8)
+
+    def count(self):
+        """
+        Returns the number of alive cells on each board
+        """
+        return np.count_nonzero(self._array, axis=(1, 2))
+
+    def step(self, boards):
+        """
+        Advances a (boards, Y, X) stack of boards one generation on a torus
+        Args:
+            boards: the boards to advance
+        Returns:
+            the new boards
+        """
+        rows = boards + np.roll(boards, 1, axis=1) + np.roll(boards, -1, axis=1)
+        neighbours = rows + np.roll(rows, 1, axis=2) + np.roll(rows, -1, axis=2) - boards
+        return self._table[boards, neighbours]
+
+    def update(self):
+        """
+        Advances every board one generation
+        """
+        self._array = self.step(self._array)
+
+    def find_equilibrium(self, steps=10, tol=1, exact=False, history=1024, max_steps=100_000):
+        """
+        Updates the boards until each reaches equilibrium, by the same criteria as CellularAutomata.find_equilibrium
+        applied to every board at once. Each board is left in the generation it was found to be in equilibrium
+        Args:
+            steps: number of updates to check
+            tol: the degree to which the number of alive cells must be the same
+            exact: whether to find the exact step each board reaches a fixed point or cycle, see
+                   CellularAutomata.find_cycle, rather than waiting for the number of alive cells to settle
+            history: number of past generations to remember when exact
+            max_steps: most generations to update for
+        Returns:
+            the number of steps each board required to reach equilibrium, -1 for boards which didn't within
+            max_steps
+        """
+        result = np.full(self.boards, -1)
+        remaining = np.arange(self.boards)
+        boards = self._array
+        seen = [{} for _ in remaining]
+        order = [deque() for _ in remaining]
+        window = deque([self.count()], maxlen=steps)
+        for t in range(max_steps + 1):
+            if exact:
+                settled = np.zeros(len(remaining), dtype=bool)
+                for i, b in enumerate(remaining):
+                    d = hashlib.blake2b(boards[i].tobytes(), digest_size=16).digest()
+                    if d in seen[b]:
+                        result[b] = seen[b][d]
+                        settled[i] = True
+                        continue
+                    seen[b][d] = t
+                    order[b].append(d)
+                    if len(order[b]) > history:
+                        del seen[b][order[b].popleft()]
+            else:
+                counts = np.array(window)
+                settled = np.all(np.abs(counts - counts[0]) <= tol + 1e-5 * np.abs(counts[0]), axis=0) & (t > 0)
+                result[remaining[settled]] = t
+            if settled.any():
+                self._array[remaining[settled]] = boards[settled]
+                boards = boards[~settled]
+                remaining = remaining[~settled]
+                window = deque((c[~settled] for c in window), maxlen=steps)
+            if len(remaining) == 0:
+                break
+            if t < max_steps:
+                boards = self.step(boards)
+                if not exact:
+                    window.append(np.count_nonzero(boards, axis=(1, 2)))
+        self._array[remaining] = boards
+        return result
+
+
+def measure_points(shape, points, p2, f_immune, equilibrate_sweeps, measurements, adaptive=False,
+                   target_error=1e-3, seed=None, census=False):
+    """
+    Measures the infected population at many (p1, p3) points with one ensemble, for use as a single pool task
+    Args:
+        shape: the size of the grid
+        points: list of (p1, p3) pairs
+        p2: Probability I->R for every point
+        f_immune: fraction of each grid which starts immune
+        equilibrate_sweeps: the number of sweeps to perform before taking measurements
+        measurements: the number of measurements to make
+        adaptive: whether to stop equilibrating and measuring each point early, see SIRSEnsemble.measure_infections
+        target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+        seed: seed of the ensemble's random numbers, see Grid
+        census: whether to also measure the number of every state at each sweep
+    Returns:
+        list of (infected, p1, p3, sweeps) for each point as returned by SIRS.measure_infections, with the census
+        after them if measured
+    """
+    p1s, p3s = np.transpose(points)
+    E = SIRSEnsemble(shape, p1s, p2, p3s, seed=seed)
+    E.randomise(f_immune)
+    results = E.measure_infections(equilibrate_sweeps, measurements, adaptive, target_error, census=census)
+    series, _, _, sweeps = results[:4]
+    states = results[4] if census else [None] * len(points)
+    measured = []
+    for inf, s, c, (p1, p3) in zip(series, sweeps, states, points):
+        kept = ~np.isnan(inf)
+        result = (inf[kept], p1, p3, tuple(map(int, s)))
+        measured.append(result if c is None else result + (c[kept],))
+    return measured
+
+
+def chunk(points, chunks):
+    """
+    Splits a list of points into a number of interleaved chunks of similar size and cost
+    """
+    return [points[i::chunks] for i in range(chunks) if points[i::chunks]]
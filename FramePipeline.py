@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+def downsample(array, factor):
+    """
+    Reduces a grid for display by keeping every factor-th cell along each axis
+    Args:
+        array: the grid
+        factor: reduction along each axis, 1 to keep the whole grid
+    Returns:
+        copy of the reduced grid
+    """
+    array = np.asarray(array)
+    if factor > 1:
+        array = array[::factor, ::factor]
+    return array.copy()
+
+
+class FramePipeline:
+    """
+    Runs an automaton in a background thread, separately from the display. After every steps_per_frame steps the
+    producer takes a frame and pushes it into a bounded ring buffer, dropping the oldest frame when the buffer is
+    full, so the simulation never waits on a redraw. The renderer takes the newest frame whenever it is ready and
+    skips any it has fallen behind on
+    Args:
+        advance: function advancing the automaton one step
+        snapshot: function returning a frame of the current state of the automaton, which must be a copy
+        frames: number of frames to produce, or None to run until stopped
+        steps_per_frame: number of steps advanced between frames
+        buffer: number of frames the ring buffer holds
+    """
+
+    def __init__(self, advance, snapshot, frames=None, steps_per_frame=1, buffer=4):
+        self.advance = advance
+        self.snapshot = snapshot
+        self.frames = frames
+        self.steps_per_frame = max(1, int(steps_per_frame))
+        self._buffer = deque(maxlen=buffer)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self.steps = 0
+        self.produced = 0
+        self.shown = 0
+        self.dropped = 0
+        self._started = None
+        self._ended = None
+        self._shown_times = deque(maxlen=30)
+
+    def _produce(self):
+        while not self._stop.is_set() and (self.frames is None or self.produced < self.frames):
+            for _ in range(self.steps_per_frame):
+                self.advance()
+            self.steps += self.steps_per_frame
+            frame = self.snapshot()
+            with self._lock:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped += 1
+                self._buffer.append(frame)
+                self.produced += 1
+        self._ended = time.perf_counter()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the producer after the step it is on
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def finished(self):
+        """
+        whether the producer has started and every frame has been produced and shown
+        """
+        with self._lock:
+            return self._started is not None and not self._thread.is_alive() and not self._buffer
+
+    def get(self):
+        """
+        Takes the newest frame, dropping any older ones still waiting
+        Returns:
+            the frame, or None if there is no new frame
+        """
+        with self._lock:
+            if not self._buffer:
+                return None
+            frame = self._buffer.pop()
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+        self.shown += 1
+        self._shown_times.append(time.perf_counter())
+        return frame
+
+    @property
+    def fps(self):
+        """
+        frames shown per second over the last few frames
+        """
+        if len(self._shown_times) < 2:
+            return 0.0
+        return (len(self._shown_times) - 1) / (self._shown_times[-1] - self._shown_times[0])
+
+    @property
+    def steps_per_second(self):
+        """
+        steps of the automaton per second while the producer has been running
+        """
+        if self._started is None:
+            return 0.0
+        end = self._ended or time.perf_counter()
+        return self.steps / max(end - self._started, 1e-9)
+
+    def readout(self):
+        return f"{self.fps:.0f} fps, {self.steps_per_second:.0f} steps/s, {self.dropped} dropped"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
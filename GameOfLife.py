@@ -1,8 +1,64 @@
 import numpy as np
-from CellularAutomata import CellularAutomata
+from CellularAutomata import CellularAutomata, centre_of_mass
+from CoMTracker import CoMTracker
+
+
+def parse_rulestring(rule: str):
+    """
+    Parses a Life-like rulestring in B/S notation e.g. "B3/S23" for Conway's Game of Life or "B36/S23" for HighLife
+    Args:
+        rule: the rulestring
+    Returns:
+        the neighbour counts which cause a birth and the neighbour counts which allow survival
+    """
+    birth = None
+    survive = None
+    for part in rule.upper().replace(' ', '').split('/'):
+        if not part or part[0] not in 'BS' or part[1:] and not part[1:].isdigit():
+            raise ValueError(f"Invalid rulestring {rule!r}")
+        counts = frozenset(int(n) for n in part[1:])
+        if any(n > 8 for n in counts):
+            raise ValueError(f"Invalid rulestring {rule!r}, neighbour counts must be between 0 and 8")
+        if part[0] == 'B' and birth is None:
+            birth = counts
+        elif part[0] == 'S' and survive is None:
+            survive = counts
+        else:
+            raise ValueError(f"Invalid rulestring {rule!r}")
+    if birth is None or survive is None:
+        raise ValueError(f"Invalid rulestring {rule!r}, expected the form B3/S23")
+    return birth, survive
 
 
 class GameOfLife(CellularAutomata):
+    """
+    Conway's Game of Life, or any other Life-like automaton given by a rulestring
+    Args:
+        shape - length and width of the grid
+        actors - value used to represent an alive cell, default 1
+        rule - rulestring in B/S notation, default "B3/S23"
+        dtype - integer type of the states, see Grid
+    """
+    compilable = True
+
+    def __init__(self, shape: tuple, actors=1, rule="B3/S23", seed=None, dtype=np.uint8):
+        super().__init__(shape, actors, seed, dtype)
+        self.rule = rule
+
+    @property
+    def rule(self):
+        """
+        The rulestring used to update the grid
+        """
+        return self._rule
+
+    @rule.setter
+    def rule(self, rule):
+        self.birth, self.survive = parse_rulestring(rule)
+        self._rule = rule
+        # any tables compiled for the old rule are no longer valid, nor are the tiles settled under it
+        self._rule_tables.clear()
+        self._touch()
 
     def beehive(self):
         """
@@ -54,37 +110,112 @@ class GameOfLife(CellularAutomata):
 
     def rules(self, c, neighbours):
         if c == self.actors[1]:
-            if neighbours == 2 or neighbours == 3:
+            if neighbours in self.survive:
                 return self.actors[1]
             else:
                 return self.actors[0]
         else:
-            if neighbours == 3:
+            if neighbours in self.birth:
                 return self.actors[1]
             else:
                 return self.actors[0]
 
     def glider_CoM(self, steps):
         """
-        Measures the centre of mass of the glider over time, accounting for the periodic boundary conditions
+        Measures the centre of mass of the glider over time, following it across the periodic boundaries, writing
+        its position on the grid at each step to glidercom.txt followed by its speed. Boards HashLife is efficient
+        for are advanced with it, visiting only the glider, otherwise the whole grid is updated
         Args:
             -steps: number of timesteps to measure for
         """
         self.glider()
-        end = np.array(self.shape) - 2
-        pos = []
+        tracker = CoMTracker(self.shape)
+        engine = self.hashlife() if self._hashlife_efficient() else None
         for _ in range(steps):
-            self.update(1)
-            x = self.CoM(1, True)
-            pos.append(x)
-            if np.array_equal(pos[-1], end) and np.array_equal(pos[-2], end):
-                break
+            if engine is None:
+                self.update(1)
+                tracker.track(self, 1)
+            else:
+                engine.step(0)
+                tracker.record(self._live_CoM(*engine.live_cells()))
+        if engine is not None:
+            engine.write(self)
+        v = float(tracker.speed)
         with open("glidercom.txt", 'w') as outfile:
             out = ''
-            for r in pos:
+            for r in np.round(tracker.positions).astype(int) % self.shape:
                 out += f"{r[0]},{r[1]}\n"
-            v = np.linalg.norm(pos[0]-pos[-1]) / len(pos)
             out += str(v)
             outfile.write(out)
 
         return v
+
+    def _hashlife_efficient(self):
+        from HashLife import HashLife
+        return HashLife.efficient(self.shape)
+
+    def _live_CoM(self, ys, xs):
+        """
+        Centre of mass of the alive cells at the given rows and columns
+        """
+        Y, X = self.shape
+        return centre_of_mass(np.bincount(ys, minlength=Y), np.bincount(xs, minlength=X), self.shape)
+
+    def hashlife(self, cache_size=1 << 20):
+        """
+        Creates a HashLife engine holding a copy of the grid for long runs
+        Args:
+            cache_size: maximum number of entries in each of the engine's caches
+        """
+        from HashLife import HashLife
+        return HashLife.from_grid(self, cache_size)
+
+    def jump(self, generations, engine=None):
+        """
+        Advances the grid a number of generations at once using HashLife
+        Args:
+            generations: number of generations to advance
+            engine: engine from a previous jump to reuse its caches, must hold the current grid
+        Returns:
+            the engine, holding the advanced grid
+        """
+        if engine is None:
+            engine = self.hashlife()
+        engine.advance(generations)
+        engine.write(self)
+        return engine
+
+    def glider_speed(self, generations, cache_size=1 << 20):
+        """
+        Measures the speed of a glider over many generations using HashLife, sampling the centre of mass often enough
+        to follow it across the periodic boundaries
+        Args:
+            generations: number of generations to measure over
+            cache_size: maximum number of entries in each of the engine's caches
+        Returns:
+            the speed of the glider in cells per generation
+        """
+        self.glider()
+        H = self.hashlife(cache_size)
+        shape = np.array(self.shape)
+        # the glider moves a quarter of a cell per generation so it can't move more than half the grid per sample
+        j = min(self.shape).bit_length() - 1
+        if H.max_jump is not None:
+            j = min(j, H.max_jump)
+
+        def centre():
+            cells = np.transpose(H.live_cells())
+            # take positions relative to one cell so a glider straddling the boundary stays in one piece
+            rel = (cells - cells[0] + shape // 2) % shape - shape // 2
+            return cells[0] + rel.mean(axis=0)
+
+        start = centre()
+        pos = start
+        displacement = np.zeros(2)
+        while H.generation < generations:
+            H.step(min(j, (generations - H.generation).bit_length() - 1))
+            new = centre()
+            displacement += (new - pos + shape / 2) % shape - shape / 2
+            pos = new
+        H.write(self)
+        return np.linalg.norm(displacement) / H.generation
@@ -4,19 +4,41 @@ class Grid:
     """
     An implementation of a gridspace to host cellular automata using ints to represent states
     0 empty
+    The number of cells in each state is kept up to date as the grid changes so counting is O(1). Changes made
+    through __setitem__ and the update methods are tracked, writes made directly to the array are not and need a
+    call to recount afterwards.
+    Random numbers come from the grid's own numpy Generator, rng, so grids in different processes have independent
+    streams and a run can be repeated exactly from its seed.
+    States are stored in a compact integer type, uint8 by default, which every update keeps.
     Args:
         - shape: the size of the grid as a tuple 
         - actors: values the grid is allowed to be comprised of
+        - seed: seed of the grid's random numbers, anything accepted by np.random.default_rng such as an int or a
+                SeedSequence. Fresh entropy is used if not given
+        - dtype: integer type of the states, must be able to hold every actor
     """
+    # when set, every count is checked against a full recount of the grid
+    check_counts = False
 
-    def __init__(self, shape: tuple, actors=1):
+    def __init__(self, shape: tuple, actors=1, seed=None, dtype=np.uint8):
+        self.rng = np.random.default_rng(seed)
+        self._uniforms = []
         self._shape = shape
         self._actors=actors
         if type(self._actors) == int:
             self._actors = [0, self._actors]
         else:
             self._actors = [0]+self._actors
-        self._array = np.full(self._shape, 0, dtype=int)
+        self._dtype = np.dtype(dtype)
+        if max(self._actors) > np.iinfo(self._dtype).max:
+            raise ValueError(f"States of type {self._dtype} can't hold the actors {self._actors}")
+        self._allocate()
+
+    def _allocate(self):
+        """
+        Creates the empty grid, overridden by grids which store their states some other way
+        """
+        self._set_array(np.full(self._shape, 0, dtype=self._dtype))
 
     def __eq__(self,other):
         return self._array.__eq__(other)
@@ -41,7 +63,9 @@ class Grid:
             - index: int/tuple specifies the row/element to modify
             -value: array/int new value to set at index
         """
+        old = np.copy(self.array.__getitem__(index))
         self.array.__setitem__(index, value)
+        self._shift_counts(old, self.array.__getitem__(index))
     
     @property
     def shape(self):
@@ -54,6 +78,13 @@ class Grid:
     def actors(self):
         return self._actors
 
+    @property
+    def dtype(self):
+        """
+        The integer type of the states
+        """
+        return self._dtype
+
     @property
     def T(self):
         return np.transpose(self)
@@ -91,19 +122,83 @@ class Grid:
         """
         Randomly assigns a state to each cell in the grid uniformly
         """
-        self._array = np.random.choice(self._actors, self.shape)
+        self._set_array(self.rng.choice(np.asarray(self._actors, dtype=self._dtype), self.shape))
 
     def full_randomise(self):
         """
         Randomly assigns a state to each cell in the grid uniformly without 0
         """
-        self._array = np.random.choice(self._actors[1:], self.shape)
+        self._set_array(self.rng.choice(np.asarray(self._actors[1:], dtype=self._dtype), self.shape))
+
+    def random(self):
+        """
+        Uniform random number in [0, 1) from the grid's generator. Numbers are generated a sweep's worth (one per
+        cell) at a time and handed out one by one, which is much cheaper than calling the generator for each
+        """
+        if not self._uniforms:
+            self._uniforms = self.rng.random(self.size).tolist()
+        return self._uniforms.pop()
 
     def clear(self):
         """
         Resets the grid back to default value
         """
-        self._array = np.full(self._shape,self._actors[0],dtype=int)
+        self._set_array(np.full(self._shape,self._actors[0],dtype=self._dtype))
+
+    def _set_array(self, array):
+        """
+        Replaces the whole grid and counts its states
+        """
+        self._array = np.asarray(array, dtype=self._dtype)
+        self.recount()
+
+    def _update_array(self, array):
+        """
+        Replaces the whole grid with a new state of it, updating the counts from only the cells which changed
+        """
+        array = np.asarray(array, dtype=self._dtype)
+        changed = array != self._array
+        self._shift_counts(self._array[changed], array[changed])
+        self._array = array
+
+    def _set_cell(self, index, value):
+        """
+        Sets a single cell, updating the counts in O(1)
+        """
+        old = self._array[index]
+        if old != value:
+            if value >= len(self._counts):
+                self._counts = np.pad(self._counts, (0, value + 1 - len(self._counts)))
+            self._counts[old] -= 1
+            self._counts[value] += 1
+            self._array[index] = value
+
+    def _shift_counts(self, old, new):
+        """
+        Updates the counts for cells which have changed from old values to new values
+        """
+        old = np.ravel(old)
+        new = np.ravel(new)
+        n = max([len(self._counts)] + [int(v.max()) + 1 for v in (old, new) if v.size])
+        if n > len(self._counts):
+            self._counts = np.pad(self._counts, (0, n - len(self._counts)))
+        self._counts += np.bincount(new, minlength=n) - np.bincount(old, minlength=n)
+
+    def recount(self):
+        """
+        Counts every state in the grid from scratch, needed after writing to the array directly
+        """
+        self._counts = np.bincount(np.ravel(self._array), minlength=max(self._actors) + 1)
+
+    def counts(self):
+        """
+        Returns the number of cells in each state, indexed by state
+        """
+        if self.check_counts:
+            expected = np.bincount(np.ravel(self.array), minlength=len(self._counts))
+            if not np.array_equal(self._counts, expected):
+                raise RuntimeError(f"Counts are {self._counts} but the grid contains {expected}")
+        return self._counts.copy()
 
     def count(self, actor):
         """
@@ -113,9 +208,10 @@ class Grid:
         Returns:
             count - the number of occurences of the states in the grid
         """
-        unique, counts = np.unique(self.array, return_counts=True)
-        counts = dict(zip(unique, counts))
-        try:
-            return counts[actor]
-        except:
-            return 0
+        count = int(self._counts[actor]) if 0 <= actor < len(self._counts) else 0
+        if self.check_counts:
+            unique, counts = np.unique(self.array, return_counts=True)
+            expected = dict(zip(unique, counts)).get(actor, 0)
+            if count != expected:
+                raise RuntimeError(f"Count of {actor} is {count} but the grid contains {expected}")
+        return count
@@ -0,0 +1,362 @@
+import numpy as np
+from collections import OrderedDict
+from GameOfLife import parse_rulestring
+
+
+class Node:
+    """
+    A square quadtree node of side 2^k. Leaves (k = 0) are single cells, every other node is made of four quadrants
+    a (north-west), b (north-east), c (south-west) and d (south-east) of side 2^(k-1)
+    """
+    __slots__ = ('k', 'a', 'b', 'c', 'd', 'pop', 'code')
+
+    def __init__(self, k, a=None, b=None, c=None, d=None, pop=0, code=None):
+        self.k = k
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.pop = pop
+        # bit pattern of the four cells of a level 1 node, used to look up the base case
+        self.code = code
+
+
+def _rule_table(birth, survive):
+    """
+    Tabulates the base case of the recursion: the centre 2x2 cells of every 4x4 block after one generation
+    Args:
+        birth: neighbour counts which cause a birth
+        survive: neighbour counts which allow survival
+    Returns:
+        list mapping the code of a 4x4 block to the code of its centre after one generation
+    """
+    q = np.arange(1 << 16)
+    cells = np.zeros((1 << 16, 4, 4), dtype=int)
+    for qi, (oy, ox) in enumerate([(0, 0), (0, 2), (2, 0), (2, 2)]):
+        for cb, (dy, dx) in enumerate([(0, 0), (0, 1), (1, 0), (1, 1)]):
+            cells[:, oy + dy, ox + dx] = (q >> (qi * 4 + cb)) & 1
+    result = np.zeros(1 << 16, dtype=int)
+    for rb, (y, x) in enumerate([(1, 1), (1, 2), (2, 1), (2, 2)]):
+        n = cells[:, y - 1:y + 2, x - 1:x + 2].sum(axis=(1, 2)) - cells[:, y, x]
+        new = np.where(cells[:, y, x] == 1, np.isin(n, list(survive)), np.isin(n, list(birth)))
+        result |= new.astype(int) << rb
+    return result.tolist()
+
+
+class HashLife:
+    """
+    HashLife engine for Life-like automata on a torus. The board is held as a hash-consed quadtree and advanced with
+    memoized recursion, so 2^j generations can be computed at once and repeated or empty regions are only evaluated
+    once. Node and result caches are bounded and evict the least recently used entries.
+
+    The torus is handled by tiling: the periodic board is evolved as an infinite plane of copies of itself. Square
+    boards with a power of two side are tiled inside the quadtree and can jump any number of generations, other
+    shapes are tiled as an array for every jump of at most 2^max_jump generations.
+    Args:
+        shape - length and width of the grid
+        rule - rulestring in B/S notation, default "B3/S23"
+        cache_size - maximum number of entries in each of the node and result caches
+    """
+
+    def __init__(self, shape: tuple, rule="B3/S23", cache_size=1 << 20):
+        self._shape = tuple(shape)
+        self.rule = rule
+        self.cache_size = cache_size
+        self.generation = 0
+        birth, survive = parse_rulestring(rule)
+        self._table = _rule_table(birth, survive)
+        # empty space stays empty unless cells are born with no neighbours
+        self._empty_stays = 0 not in birth
+        self._nodes = OrderedDict()
+        self._results = OrderedDict()
+        self._off = Node(0, pop=0)
+        self._on = Node(0, pop=1)
+        self._level1 = []
+        for code in range(16):
+            leaves = [self._on if code >> i & 1 else self._off for i in range(4)]
+            self._level1.append(Node(1, *leaves, pop=bin(code).count('1'), code=code))
+        self._empty = [self._off, self._level1[0]]
+        Y, X = self._shape
+        # side of the tree holding the board when it can be tiled inside the quadtree
+        self._torus_level = Y.bit_length() - 1 if self.efficient(self._shape) else None
+        # smallest node whose centre covers the board when it is tiled as an array
+        self._window_level = max(2, (max(Y, X) - 1).bit_length() + 1)
+        self.array = np.zeros(self._shape, dtype=np.uint8)
+
+    @staticmethod
+    def efficient(shape):
+        """
+        Whether boards of a shape are tiled inside the quadtree, square with a power of two side, so that even single
+        generations cost less than updating the whole grid. Other shapes are rebuilt from an array every jump
+        """
+        Y, X = shape
+        return Y == X and Y > 1 and Y & (Y - 1) == 0
+
+    @classmethod
+    def from_grid(cls, grid, cache_size=1 << 20):
+        """
+        Creates an engine holding a copy of a Game of Life grid
+        Args:
+            grid: GameOfLife grid to copy
+            cache_size: maximum number of entries in each cache
+        """
+        H = cls(grid.shape, getattr(grid, 'rule', "B3/S23"), cache_size)
+        H.array = np.asarray(grid) == grid.actors[1]
+        return H
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def max_jump(self):
+        """
+        The largest j for which a single step of 2^j generations is efficient, None if unbounded
+        """
+        if self._torus_level is not None:
+            return None
+        return self._window_level - 2
+
+    @property
+    def array(self):
+        """
+        The board as a uint8 array of 0s and 1s
+        """
+        if self._torus_level is not None:
+            out = np.zeros(self._shape, dtype=np.uint8)
+            self._fill(self._root, out, 0, 0)
+            return out
+        return self._array.astype(np.uint8)
+
+    @array.setter
+    def array(self, array):
+        array = np.asarray(array) != 0
+        if array.shape != self._shape:
+            raise ValueError(f"Expected an array of shape {self._shape}, got {array.shape}")
+        if self._torus_level is not None:
+            self._root = self._from_array(array)
+        else:
+            self._array = array.copy()
+
+    @property
+    def population(self):
+        """
+        Number of alive cells
+        """
+        if self._torus_level is not None:
+            return self._root.pop
+        return int(self._array.sum())
+
+    def write(self, grid):
+        """
+        Copies the board into a Game of Life grid
+        """
+        grid[:, :] = self.array * grid.actors[1]
+
+    def _join(self, a, b, c, d):
+        """
+        Returns the canonical node made of four quadrants
+        """
+        if a.k == 0:
+            return self._level1[a.pop | b.pop << 1 | c.pop << 2 | d.pop << 3]
+        key = (a, b, c, d)
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(a.k + 1, a, b, c, d, a.pop + b.pop + c.pop + d.pop)
+            self._nodes[key] = node
+            if len(self._nodes) > self.cache_size:
+                self._nodes.popitem(last=False)
+        else:
+            self._nodes.move_to_end(key)
+        return node
+
+    def _empty_node(self, k):
+        while len(self._empty) <= k:
+            e = self._empty[-1]
+            self._empty.append(self._join(e, e, e, e))
+        return self._empty[k]
+
+    def _step(self, m, j):
+        """
+        Advances the centre of a node 2^j generations
+        Args:
+            m: node of level k >= 2
+            j: 0 <= j <= k - 2
+        Returns:
+            the centre of the node, of level k - 1, after 2^j generations
+        """
+        if m.pop == 0 and self._empty_stays:
+            return self._empty_node(m.k - 1)
+        key = (m, j)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            return result
+        if m.k == 2:
+            result = self._level1[self._table[m.a.code | m.b.code << 4 | m.c.code << 8 | m.d.code << 12]]
+        else:
+            join = self._join
+            a, b, c, d = m.a, m.b, m.c, m.d
+            sub = min(j, m.k - 3)
+            c1 = self._step(a, sub)
+            c2 = self._step(join(a.b, b.a, a.d, b.c), sub)
+            c3 = self._step(b, sub)
+            c4 = self._step(join(a.c, a.d, c.a, c.b), sub)
+            c5 = self._step(join(a.d, b.c, c.b, d.a), sub)
+            c6 = self._step(join(b.c, b.d, d.a, d.b), sub)
+            c7 = self._step(c, sub)
+            c8 = self._step(join(c.b, d.a, c.d, d.c), sub)
+            c9 = self._step(d, sub)
+            if j < m.k - 2:
+                # the nine sub-results already cover 2^j generations so only their centres are combined
+                result = join(join(c1.d, c2.c, c4.b, c5.a), join(c2.d, c3.c, c5.b, c6.a),
+                              join(c4.d, c5.c, c7.b, c8.a), join(c5.d, c6.c, c8.b, c9.a))
+            else:
+                result = join(self._step(join(c1, c2, c4, c5), sub), self._step(join(c2, c3, c5, c6), sub),
+                              self._step(join(c4, c5, c7, c8), sub), self._step(join(c5, c6, c8, c9), sub))
+        self._results[key] = result
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result
+
+    def _from_array(self, array):
+        """
+        Builds the quadtree of a square array with a power of two side
+        """
+        if array.shape[0] == 1:
+            return self._on if array[0, 0] else self._off
+        a = array.astype(np.uint8)
+        codes = a[0::2, 0::2] | a[0::2, 1::2] << 1 | a[1::2, 0::2] << 2 | a[1::2, 1::2] << 3
+        level1 = np.empty(16, dtype=object)
+        level1[:] = self._level1
+        nodes = level1[codes]
+        while nodes.shape[0] > 1:
+            quads = zip(nodes[0::2, 0::2].ravel(), nodes[0::2, 1::2].ravel(),
+                        nodes[1::2, 0::2].ravel(), nodes[1::2, 1::2].ravel())
+            joined = np.empty(nodes.shape[0] // 2 * nodes.shape[1] // 2, dtype=object)
+            joined[:] = [self._join(*q) for q in quads]
+            nodes = joined.reshape(nodes.shape[0] // 2, nodes.shape[1] // 2)
+        return nodes[0, 0]
+
+    def _fill(self, node, out, y, x):
+        """
+        Writes the alive cells of a node into the part of out which lies inside it, with its corner at (y, x)
+        """
+        if node.pop == 0 or y >= out.shape[0] or x >= out.shape[1]:
+            return
+        if node.k == 0:
+            out[y, x] = 1
+            return
+        h = 1 << (node.k - 1)
+        self._fill(node.a, out, y, x)
+        self._fill(node.b, out, y, x + h)
+        self._fill(node.c, out, y + h, x)
+        self._fill(node.d, out, y + h, x + h)
+
+    def _cells(self, node, y, x, ys, xs):
+        if node.pop == 0:
+            return
+        if node.k == 0:
+            ys.append(y)
+            xs.append(x)
+            return
+        h = 1 << (node.k - 1)
+        self._cells(node.a, y, x, ys, xs)
+        self._cells(node.b, y, x + h, ys, xs)
+        self._cells(node.c, y + h, x, ys, xs)
+        self._cells(node.d, y + h, x + h, ys, xs)
+
+    def live_cells(self):
+        """
+        Positions of the alive cells, only visiting the parts of the tree which contain them
+        Returns:
+            tuple of row and column indices
+        """
+        if self._torus_level is None:
+            return np.nonzero(self._array)
+        ys = []
+        xs = []
+        self._cells(self._root, 0, 0, ys, xs)
+        return np.array(ys, dtype=int), np.array(xs, dtype=int)
+
+    def step(self, j):
+        """
+        Advances the board 2^j generations
+        Args:
+            j: log2 of the number of generations to advance
+        """
+        if self._torus_level is not None:
+            n = self._torus_level
+            k = max(j, n) + 2
+            tiled = self._root
+            for _ in range(n, k):
+                tiled = self._join(tiled, tiled, tiled, tiled)
+            # the centre starts 2^(k-2) cells in, a whole number of boards, so its corner is the board itself
+            result = self._step(tiled, j)
+            for _ in range(n, k - 1):
+                result = result.a
+            self._root = result
+        else:
+            k = max(self._window_level, j + 2)
+            side = 1 << k
+            offset = 1 << (k - 2)
+            rows = (np.arange(side) - offset) % self._shape[0]
+            cols = (np.arange(side) - offset) % self._shape[1]
+            result = self._step(self._from_array(self._array[np.ix_(rows, cols)]), j)
+            out = np.zeros(self._shape, dtype=bool)
+            self._fill(result, out, 0, 0)
+            self._array = out
+        self.generation += 1 << j
+
+    def advance(self, generations: int):
+        """
+        Advances the board a number of generations using the largest jumps available
+        Args:
+            generations: number of generations to advance
+        """
+        while generations > 0:
+            j = generations.bit_length() - 1
+            if self.max_jump is not None:
+                j = min(j, self.max_jump)
+            self.step(j)
+            generations -= 1 << j
+
+    def _state(self):
+        if self._torus_level is not None:
+            return self._root
+        return self._array.tobytes()
+
+    def settle(self, max_generations: int, j=None):
+        """
+        Advances the board in jumps of 2^j generations until it is unchanged by a jump, which finds fixed points and
+        any cycle whose period divides 2^j
+        Args:
+            max_generations: the most generations to advance
+            j: log2 of the jump size, defaults to the largest efficient jump up to 2^10
+        Returns:
+            the number of generations advanced when the board stopped changing, or None if it did not
+        """
+        if j is None:
+            j = 10 if self.max_jump is None else min(10, self.max_jump)
+        start = self.generation
+        previous = self._state()
+        while self.generation - start < max_generations:
+            self.step(j)
+            state = self._state()
+            if self._same(state, previous):
+                return self.generation - start
+            previous = state
+        return None
+
+    def _same(self, state, previous):
+        if self._torus_level is None:
+            return state == previous
+        # nodes are canonical while they are cached, otherwise fall back to comparing the boards
+        if state is previous:
+            return True
+        return state.pop == previous.pop and np.array_equal(self._tree_array(state), self._tree_array(previous))
+
+    def _tree_array(self, node):
+        out = np.zeros(self._shape, dtype=np.uint8)
+        self._fill(node, out, 0, 0)
+        return out
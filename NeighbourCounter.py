@@ -0,0 +1,251 @@
+import numpy as np
+import scipy.fft
+from functools import lru_cache
+
+# the neighbourhoods of the models, read-only as they're shared as default weights
+MOORE = np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]])
+VON_NEUMANN = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]])
+MOORE.flags.writeable = False
+VON_NEUMANN.flags.writeable = False
+# cost of a forward and inverse FFT per cell per log2(cells), relative to adding one shifted slice per cell
+FFT_COST = 12
+
+
+def count_dtype(weight):
+    """
+    Smallest type which can hold any number of neighbours for a weighting, e.g. uint8 for the Moore neighbourhood
+    Args:
+        weight: weighting of neighbours to consider
+    """
+    weight = np.asarray(weight)
+    if not np.issubdtype(weight.dtype, np.integer):
+        return weight.dtype
+    low = int(weight[weight < 0].sum())
+    high = int(weight[weight > 0].sum())
+    return np.result_type(np.min_scalar_type(low), np.min_scalar_type(high))
+
+
+def separate(weight):
+    """
+    Factors a kernel into a column and a row, weight = outer(column, row), if it can be. Integer kernels are only
+    separated into integer factors
+    Args:
+        weight: the kernel
+    Returns:
+        the column and row, or None if the kernel isn't separable
+    """
+    weight = np.asarray(weight)
+    nonzero = np.argwhere(weight != 0)
+    if len(nonzero) == 0:
+        return None
+    r, c = nonzero[0]
+    column = weight[:, c]
+    row = weight[r, :] / weight[r, c]
+    if np.issubdtype(weight.dtype, np.integer):
+        if not np.array_equal(row, np.round(row)):
+            column, row = weight[:, c] // weight[r, c], weight[r, :]
+            if not np.array_equal(column * weight[r, c], weight[:, c]):
+                return None
+        row = row.astype(weight.dtype)
+        if not np.array_equal(np.outer(column, row), weight):
+            return None
+    elif not np.allclose(np.outer(column, row), weight):
+        return None
+    return column, row
+
+
+def separate_centre(weight):
+    """
+    Factors a kernel into a column and a row apart from its centre, weight = outer(column, row) + centre at the
+    centre, as for a square neighbourhood which leaves out the cell itself
+    Args:
+        weight: the kernel
+    Returns:
+        the column, row and centre correction, or None if the kernel isn't separable
+    """
+    weight = np.asarray(weight)
+    ry, rx = weight.shape[0] // 2, weight.shape[1] // 2
+    factors = separate(weight)
+    if factors is not None:
+        return factors + (0,)
+    # the centre of a separable kernel is fixed by any weight outside its row and column
+    outside = np.argwhere(weight != 0)
+    outside = outside[(outside[:, 0] != ry) & (outside[:, 1] != rx)]
+    if len(outside) == 0:
+        return None
+    a, b = outside[0]
+    centre = weight[ry, b] * weight[a, rx] / weight[a, b]
+    if np.issubdtype(weight.dtype, np.integer):
+        if centre != round(centre):
+            return None
+        centre = round(centre)
+    filled = weight.copy()
+    filled[ry, rx] = centre
+    factors = separate(filled)
+    if factors is None:
+        return None
+    return factors + ((weight[ry, rx] - centre).item(),)
+
+
+@lru_cache(maxsize=32)
+def _spectrum(shape, kernel_shape, dtype, kernel):
+    weight = np.frombuffer(kernel, dtype=dtype).reshape(kernel_shape)
+    Y, X = shape
+    ky, kx = kernel_shape
+    # the kernel is wrapped onto the grid with its centre at the origin, folding kernels larger than the grid
+    wrapped = np.zeros(shape)
+    a, b = np.nonzero(weight)
+    np.add.at(wrapped, ((a - ky // 2) % Y, (b - kx // 2) % X), weight[a, b])
+    return scipy.fft.rfft2(wrapped)
+
+
+def kernel_spectrum(shape, weight):
+    """
+    Spectrum of a kernel wrapped periodically onto a grid, cached for each (shape, kernel) so repeated counts only
+    pay for the transforms of the mask
+    Args:
+        shape: the shape of the grid
+        weight: the kernel
+    Returns:
+        the real FFT of the wrapped kernel
+    """
+    weight = np.ascontiguousarray(weight)
+    return _spectrum(tuple(shape), weight.shape, weight.dtype.str, weight.tobytes())
+
+
+class NeighbourCounter:
+    """
+    Counts the neighbours of a given value around every cell of a grid with wrap-around boundaries, the same as
+    convolving a mask of the value with the weight. One of four methods is chosen for the kernel, by an estimate of
+    the work per cell unless given:
+        'moore': the Moore neighbourhood summed as a 3x3 box, rows then columns, less the centre
+        'direct': one shifted slice added for each nonzero weight
+        'separable': kernels which are the outer product of a column and a row, summed along the columns then the
+                     rows, for one slice per weight of each. The centre may differ, see separate_centre
+        'fft': the product of the mask's spectrum with the kernel's, for large kernels. The kernel's spectrum is
+               cached per (shape, kernel), see kernel_spectrum
+    The slice methods write the mask into a preallocated buffer padded with a halo of wrapped cells and sum into a
+    preallocated output in place, so once created counting allocates nothing
+    Args:
+        shape: the shape of the grid
+        weight: weighting of neighbours to consider, centred on the cell
+        method: one of the methods above, or None to choose
+    """
+    methods = ('moore', 'direct', 'separable', 'fft')
+
+    def __init__(self, shape, weight, method=None):
+        self.shape = tuple(shape)
+        self.weight = np.array(weight)
+        self.dtype = count_dtype(self.weight)
+        Y, X = self.shape
+        ky, kx = self.weight.shape
+        self._ry, self._rx = ky // 2, kx // 2
+        factors = separate_centre(self.weight)
+        costs = {'fft': FFT_COST * np.log2(Y * X)}
+        # the halo can only wrap around the grid once
+        if self._ry <= Y and self._rx <= X:
+            costs['direct'] = np.count_nonzero(self.weight)
+            if factors is not None:
+                costs['separable'] = np.count_nonzero(factors[0]) + np.count_nonzero(factors[1]) + 1 + (factors[2] != 0)
+            if np.array_equal(self.weight, MOORE):
+                costs['moore'] = 5
+        if method is None:
+            method = min(costs, key=costs.get)
+        elif method not in costs:
+            raise ValueError(f"Can't count neighbours of a {ky}x{kx} kernel on a {Y}x{X} grid with {method}, "
+                             f"expected one of {sorted(costs)}")
+        self.method = method
+        self._out = np.zeros(self.shape, dtype=self.dtype)
+        if method == 'fft':
+            self._spectrum = kernel_spectrum(self.shape, self.weight)
+            return
+        self._halo = np.zeros((Y + 2 * self._ry, X + 2 * self._rx), dtype=self.dtype)
+        # convolution flips the kernel, the weight at (a, b) reads the halo from (2ry - a, 2rx - b)
+        if method == 'moore':
+            self._rows = np.zeros((Y, X + 2), dtype=self.dtype)
+        elif method == 'direct':
+            self._scratch = np.zeros(self.shape, dtype=self.dtype)
+            self._terms = [(2 * self._ry - a, 2 * self._rx - b, self.weight[a, b].item())
+                           for a, b in np.argwhere(self.weight != 0)]
+        else:
+            column, row, self._centre = factors
+            self._rows = np.zeros((Y, X + 2 * self._rx), dtype=np.result_type(count_dtype(column), self.dtype))
+            self._row_scratch = np.zeros_like(self._rows)
+            self._scratch = np.zeros(self.shape, dtype=self.dtype)
+            self._column_terms = [(2 * self._ry - a, column[a].item()) for a in np.flatnonzero(column)]
+            self._row_terms = [(2 * self._rx - b, row[b].item()) for b in np.flatnonzero(row)]
+
+    def _fill(self, array, value):
+        """
+        Writes the mask of the value into the halo buffer and wraps its edges around
+        """
+        ry, rx = self._ry, self._rx
+        Y, X = self.shape
+        halo = self._halo
+        interior = halo[ry:ry + Y, rx:rx + X]
+        # one byte counts can take the mask as booleans directly, without a buffered cast
+        np.equal(array, value, out=interior.view(bool) if self.dtype.itemsize == 1 else interior, casting='unsafe')
+        if ry:
+            halo[:ry, rx:rx + X] = halo[Y:Y + ry, rx:rx + X]
+            halo[ry + Y:, rx:rx + X] = halo[ry:2 * ry, rx:rx + X]
+        if rx:
+            halo[:, :rx] = halo[:, X:X + rx]
+            halo[:, rx + X:] = halo[:, rx:2 * rx]
+
+    @staticmethod
+    def _accumulate(out, windows, scratch):
+        """
+        Sums weighted windows into out in place
+        Args:
+            out: array to sum into
+            windows: (window, weight) pairs of arrays the shape of out
+            scratch: array the shape of out to weight windows in
+        """
+        out[...] = 0
+        for window, w in windows:
+            if w == 1:
+                out += window
+            else:
+                np.multiply(window, w, out=scratch, casting='unsafe')
+                out += scratch
+
+    def count(self, array, value):
+        """
+        Counts the neighbours of a value around every cell
+        Args:
+            array: the grid
+            value: value representing which actor to consider a neighbour
+        Returns:
+            array of number of neighbours. This is the counter's own output buffer, overwritten by the next count
+        """
+        out = self._out
+        if self.method == 'fft':
+            counts = scipy.fft.irfft2(scipy.fft.rfft2(np.asarray(array) == value) * self._spectrum, s=self.shape)
+            if np.issubdtype(self.dtype, np.integer):
+                np.rint(counts, out=counts)
+            np.copyto(out, counts, casting='unsafe')
+            return out
+        self._fill(array, value)
+        Y, X = self.shape
+        halo = self._halo
+        if self.method == 'moore':
+            rows = self._rows
+            np.add(halo[:Y], halo[1:Y + 1], out=rows)
+            rows += halo[2:Y + 2]
+            np.add(rows[:, :X], rows[:, 1:X + 1], out=out)
+            out += rows[:, 2:X + 2]
+            out -= halo[1:Y + 1, 1:X + 1]
+        elif self.method == 'direct':
+            self._accumulate(out, ((halo[dy:dy + Y, dx:dx + X], w) for dy, dx, w in self._terms), self._scratch)
+        else:
+            self._accumulate(self._rows, ((halo[dy:dy + Y], w) for dy, w in self._column_terms), self._row_scratch)
+            self._accumulate(out, ((self._rows[:, dx:dx + X], w) for dx, w in self._row_terms), self._scratch)
+            if self._centre:
+                centre = halo[self._ry:self._ry + Y, self._rx:self._rx + X]
+                if abs(self._centre) != 1:
+                    centre = np.multiply(centre, abs(self._centre), out=self._scratch, casting='unsafe')
+                if self._centre > 0:
+                    out += centre
+                else:
+                    out -= centre
+        return out
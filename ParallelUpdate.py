@@ -0,0 +1,208 @@
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import os
+from NeighbourCounter import count_dtype, MOORE
+from threading import BrokenBarrierError
+
+# rows of a strip updated at a time, bounds the temporary arrays each worker allocates
+CHUNK_ROWS = 256
+
+
+def _update_rows(src, dst, y0, y1, actor, weight, table):
+    """
+    Writes the next state of rows [y0, y1) of src into dst using the rows either side of them as a halo
+    """
+    Y = src.shape[0]
+    block = src[np.arange(y0 - 1, y1 + 1) % Y]
+    # counts are kept in the smallest type which can hold them, as CellularAutomata.update does
+    dtype = count_dtype(weight)
+    weight = weight.astype(dtype)
+    mask = (block == actor).astype(dtype)
+    # wrap the columns so the neighbourhood of the edge cells is complete
+    mask = np.concatenate([mask[:, -1:], mask, mask[:, :1]], axis=1)
+    h = y1 - y0
+    X = src.shape[1]
+    neighbours = np.zeros((h, X), dtype=dtype)
+    for (dy, dx), w in zip(np.argwhere(weight != 0), weight[weight != 0]):
+        neighbours += w * mask[dy:dy + h, dx:dx + X]
+    dst[y0:y1] = table[block[1:-1], neighbours]
+
+
+def _worker(names, shape, dtype, y0, y1, actor, weight, table, start, step, done, command, parity):
+    """
+    Persistent worker owning the strip of rows [y0, y1). Waits for a command, advances its strip that many
+    generations, synchronising with the other workers between generations, then waits for the next command
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    buffers = [np.ndarray(shape, dtype=dtype, buffer=b.buf) for b in blocks]
+    try:
+        while True:
+            start.wait()
+            steps = command.value
+            if steps < 0:
+                break
+            current = parity.value
+            for _ in range(steps):
+                src = buffers[current]
+                dst = buffers[1 - current]
+                for y in range(y0, y1, CHUNK_ROWS):
+                    _update_rows(src, dst, y, min(y + CHUNK_ROWS, y1), actor, weight, table)
+                # every strip must be written before any worker reads its halo for the next generation
+                step.wait()
+                current = 1 - current
+            done.wait()
+    except BrokenBarrierError:
+        pass
+    except BaseException:
+        # break every barrier so the driver and the other workers raise rather than wait forever
+        for barrier in (start, step, done):
+            barrier.abort()
+        raise
+    finally:
+        del buffers
+        for b in blocks:
+            b.close()
+
+
+class ParallelUpdate:
+    """
+    Synchronous update of a single large grid across several processes. The grid is double buffered in shared
+    memory and split into strips of rows, each owned by a persistent worker. Every generation a worker reads its
+    strip and the rows either side of it from one buffer and writes its strip to the other, keeping the
+    wrap-around boundaries of Grid. Only models with compiled rule tables are supported.
+    Args:
+        array: the initial grid
+        table: rule table from CellularAutomata.compile_rules
+        actor: the actor that effect the update
+        weight: 3x3 weighting of neighbours to consider
+        workers: number of worker processes, defaults to the number of cores
+        timeout: seconds to wait for the workers to finish a command before giving up, None to wait as long as
+                 they take
+    """
+
+    def __init__(self, array, table, actor=1, weight=MOORE, workers=None, timeout=None):
+        if np.shape(weight) != (3, 3):
+            raise ValueError(f"Parallel updates only support 3x3 weightings, got {np.shape(weight)}")
+        array = np.asarray(array)
+        self._shape = array.shape
+        workers = workers or os.cpu_count()
+        workers = min(workers, self._shape[0])
+        self._dtype = np.uint8 if array.max(initial=0) < 256 and table.max() < 256 else np.int64
+        nbytes = int(np.prod(self._shape)) * np.dtype(self._dtype).itemsize
+        self._blocks = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(2)]
+        self._buffers = [np.ndarray(self._shape, dtype=self._dtype, buffer=b.buf) for b in self._blocks]
+        self._buffers[0][:] = array
+        ctx = mp.get_context()
+        self._start = ctx.Barrier(workers + 1, timeout=timeout)
+        self._done = ctx.Barrier(workers + 1, timeout=timeout)
+        step = ctx.Barrier(workers)
+        self._command = ctx.Value('q', 0)
+        self._parity = ctx.Value('i', 0)
+        bounds = np.linspace(0, self._shape[0], workers + 1).astype(int)
+        names = [b.name for b in self._blocks]
+        self._workers = []
+        for y0, y1 in zip(bounds[:-1], bounds[1:]):
+            p = ctx.Process(target=_worker, daemon=True,
+                            args=(names, self._shape, self._dtype, int(y0), int(y1), actor, np.asarray(weight),
+                                  np.asarray(table, dtype=self._dtype), self._start, step, self._done,
+                                  self._command, self._parity))
+            p.start()
+            self._workers.append(p)
+        self.generation = 0
+
+    @classmethod
+    def from_automaton(cls, automaton, actor=1, weight=MOORE, workers=None, timeout=None):
+        """
+        Creates a parallel update of a copy of an automaton's grid
+        """
+        if np.shape(weight) != (3, 3):
+            raise ValueError(f"Parallel updates only support 3x3 weightings, got {np.shape(weight)}")
+        table = automaton.compile_rules(weight)
+        if table is None:
+            raise ValueError(f"{automaton.__class__.__name__} rules can't be compiled for parallel updates")
+        return cls(automaton.array, table, actor, weight, workers, timeout)
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def workers(self):
+        return len(self._workers)
+
+    @property
+    def array(self):
+        """
+        A copy of the current grid, in the compact type it is held in
+        """
+        return self._buffers[self._parity.value].copy()
+
+    def update(self, steps=1):
+        """
+        Advances the grid a number of generations
+        Args:
+            steps: number of generations to advance
+        """
+        if not self._workers:
+            raise RuntimeError("The parallel update has been closed")
+        self._command.value = steps
+        self._wait(self._start)
+        self._wait(self._done)
+        self._parity.value = (self._parity.value + steps) % 2
+        self.generation += steps
+
+    def _wait(self, barrier):
+        """
+        Waits for the workers at a barrier. If a worker failed or timed out the workers are stopped and the shared
+        memory released, as the grid is left part way through a generation
+        """
+        try:
+            barrier.wait()
+        except BrokenBarrierError:
+            for p in self._workers:
+                p.join(timeout=1)
+            codes = [p.exitcode for p in self._workers]
+            self._terminate()
+            raise RuntimeError(f"A parallel update worker failed or timed out, worker exit codes {codes}") from None
+
+    def _terminate(self):
+        for p in self._workers:
+            p.terminate()
+            p.join()
+        self._workers = []
+        self._release()
+
+    def _release(self):
+        del self._buffers
+        for b in self._blocks:
+            b.close()
+            b.unlink()
+
+    def write(self, automaton):
+        """
+        Copies the current grid into an automaton
+        """
+        automaton._set_array(self.array)
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory
+        """
+        if self._workers:
+            self._command.value = -1
+            try:
+                self._start.wait()
+            except BrokenBarrierError:
+                self._terminate()
+                return
+            for p in self._workers:
+                p.join()
+            self._workers = []
+            self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,214 @@
+import numpy as np
+import json
+import os
+import pickle
+import shutil
+from functools import partial
+from Checkpoint import atomic_write
+from error_analysis import jackknife, blocking, infected_variance
+
+# columns of a SIRS phase diagram: the parameters, the infected fraction, its variance and the error on the variance
+PHASE_COLUMNS = {'p1': ('f8', ()), 'p3': ('f8', ()), 'val': ('f8', ()), 'var': ('f8', ()), 'err': ('f8', ())}
+
+
+class ResultsStore:
+    """
+    Column store of sweep results on disk. Every column is a raw binary file with one row per parameter point, its
+    type and row shape recorded in meta.json, opened with memory mapping so slices can be read without loading the
+    whole store. Rows are appended, growing the files in place by extending them rather than copying, and the number
+    of valid rows is recorded in meta.json after the data is written, so an interrupted append is never seen.
+    Args:
+        directory: where the store is kept
+        columns: dict of column name to (dtype, shape of one row), needed to create a new store. If the store
+                 exists the columns must match it
+        capacity: number of rows to allocate when creating the store, grown as needed
+    """
+
+    def __init__(self, directory, columns=None, capacity=1024):
+        self.directory = directory
+        meta = os.path.join(directory, 'meta.json')
+        if os.path.isfile(meta):
+            with open(meta) as infile:
+                self._meta = json.load(infile)
+            if columns is not None and self._columns(columns) != self._meta['columns']:
+                raise ValueError(f"Store {directory} has columns {self._meta['columns']}")
+        elif columns is None:
+            raise FileNotFoundError(f"No results store in {directory}")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._meta = {'columns': self._columns(columns), 'count': 0, 'capacity': 0}
+            self._grow(capacity)
+
+    @staticmethod
+    def _columns(columns):
+        return {name: [np.dtype(dtype).str, list(shape)] for name, (dtype, shape) in columns.items()}
+
+    @staticmethod
+    def exists(directory):
+        return os.path.isfile(os.path.join(directory, 'meta.json'))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def _write_meta(self):
+        atomic_write(os.path.join(self.directory, 'meta.json'), json.dumps(self._meta))
+
+    def _grow(self, capacity):
+        """
+        Extends every column file to hold capacity rows, leaving the rows already written where they are
+        """
+        for name, (dtype, shape) in self._meta['columns'].items():
+            nbytes = capacity * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize
+            with open(self._path(name), 'ab') as f:
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)
+        self._meta['capacity'] = capacity
+        self._write_meta()
+
+    def _map(self, name, mode='r'):
+        """
+        Memory maps every allocated row of a column
+        """
+        dtype, shape = self._meta['columns'][name]
+        shape = (self._meta['capacity'],) + tuple(shape)
+        # a file of no bytes can't be mapped
+        if np.prod(shape, dtype=int) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode=mode, shape=shape)
+
+    def __len__(self):
+        return self._meta['count']
+
+    @property
+    def columns(self):
+        return list(self._meta['columns'])
+
+    def column(self, name):
+        """
+        Returns a read-only memory map of the valid rows of a column
+        """
+        return self._map(name)[:len(self)]
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def append(self, **rows):
+        """
+        Appends rows to the store. Every column must be given, either as one row or as arrays of rows of equal length
+        e.g. store.append(p1=0.5, p3=0.1, val=0.2, var=1.3, err=0.1)
+        """
+        if set(rows) != set(self.columns):
+            raise ValueError(f"Expected values for the columns {self.columns}")
+        arrays = {}
+        n = None
+        for name, (dtype, shape) in self._meta['columns'].items():
+            a = np.asarray(rows[name], dtype=dtype)
+            if a.ndim == len(shape):
+                a = a[None]
+            if n is not None and len(a) != n:
+                raise ValueError("Every column must have the same number of rows")
+            n = len(a)
+            arrays[name] = a
+        start = len(self)
+        if start + n > self._meta['capacity']:
+            self._grow(max(2 * self._meta['capacity'], start + n))
+        for name, a in arrays.items():
+            column = self._map(name, 'r+')
+            column[start:start + n] = a
+            if isinstance(column, np.memmap):
+                column.flush()
+            del column
+        self._meta['count'] = start + n
+        self._write_meta()
+
+    def is_grid(self, x='p1', y='p3'):
+        """
+        Whether the points form a complete regular grid of two parameter columns, rather than being scattered
+        """
+        xs = np.unique(self.column(x))
+        ys = np.unique(self.column(y))
+        points = np.unique(np.stack([self.column(x), self.column(y)], axis=1), axis=0)
+        return len(points) == len(xs) * len(ys)
+
+    def grid(self, name, x='p1', y='p3'):
+        """
+        Arranges a column on the grid of two parameter columns, for stores of regularly spaced points (see is_grid).
+        Where a point appears more than once the latest value is used and missing points are NaN
+        Args:
+            name: the column of values
+            x: the column giving the rows of the grid
+            y: the column giving the columns of the grid
+        Returns:
+            the values of x, the values of y, and the (len(x), len(y)) array of values
+        """
+        xs, i = np.unique(self.column(x), return_inverse=True)
+        ys, j = np.unique(self.column(y), return_inverse=True)
+        values = np.full((len(xs), len(ys)), np.nan)
+        values[i.ravel(), j.ravel()] = self.column(name)
+        return xs, ys, values
+
+    @classmethod
+    def from_pickle(cls, path, directory):
+        """
+        Converts the dict of dicts pickle written by earlier phase diagram sweeps into a store
+        Args:
+            path: the pickle e.g. "SIRSMeasurements"
+            directory: where to create the store
+        """
+        with open(path, 'rb') as infile:
+            data = pickle.load(infile)
+        rows = [(p1, p3, v['val'], v['var']) for p1 in data for p3, v in data[p1].items()]
+        p1, p3, val, var = np.array(rows, dtype=float).T
+        store = cls(directory, PHASE_COLUMNS, max(len(rows), 1))
+        store.append(p1=p1, p3=p3, val=val, var=var, err=np.full(len(rows), np.nan))
+        return store
+
+
+def save_phase_diagram(directory, p1, p3, series, size, sweeps=None, census=None):
+    """
+    Writes the results of a phase diagram sweep to a new store, replacing any existing store once it is complete
+    Args:
+        directory: where to create the store
+        p1: p1 of each point
+        p3: p3 of each point
+        series: the number of infected at each measurement of each point, series which stopped early may be shorter
+        size: number of cells in the grid
+        sweeps: optional (points, 2) number of equilibration and measurement sweeps performed at each point
+        census: optional (measurements, states) number of every state at each measurement of each point, stored
+                padded like series
+    Returns:
+        the store
+    """
+    length = max((len(s) for s in series), default=0)
+    padded = np.full((len(series), length), np.nan)
+    for i, s in enumerate(series):
+        padded[i, :len(s)] = s
+    av_inf = np.nanmean(padded, axis=1)
+    av_inf_squared = np.nanmean(np.power(padded, 2), axis=1)
+    # errors account for the correlation between consecutive sweeps
+    err = np.array([jackknife(s, partial(infected_variance, size=size)) for s in series])
+    val_err = np.array([blocking(s) / size for s in series])
+    if sweeps is None:
+        sweeps = np.full((len(series), 2), -1)
+    sweeps = np.asarray(sweeps)
+    tmp = directory.rstrip(os.sep) + '.tmp'
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    columns = dict(PHASE_COLUMNS, val_err=('f8', ()), series=('f4', (length,)), equilibrate_sweeps=('i8', ()),
+                   measure_sweeps=('i8', ()))
+    extra = {}
+    if census is not None:
+        states = max((np.shape(c)[1] for c in census if np.ndim(c) == 2), default=0)
+        extra['census'] = np.full((len(series), length, states), np.nan)
+        for i, c in enumerate(census):
+            c = np.asarray(c).reshape(-1, states)
+            extra['census'][i, :len(c)] = c
+        columns['census'] = ('f4', (length, states))
+    store = ResultsStore(tmp, columns, max(len(series), 1))
+    store.append(p1=p1, p3=p3, val=av_inf / size, var=(av_inf_squared - av_inf) / size,
+                 err=err, val_err=val_err, series=padded, equilibrate_sweeps=sweeps[:, 0],
+                 measure_sweeps=sweeps[:, 1], **extra)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.replace(tmp, directory)
+    return ResultsStore(directory)
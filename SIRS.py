@@ -2,6 +2,43 @@ import numpy as np
 from CellularAutomata import CellularAutomata
 import time
 
+# number of batches the measurements are split into to estimate the error on their mean
+BATCHES = 10
+# fewest measurements made before their error is trusted to stop measuring
+MIN_MEASUREMENTS = 100
+
+
+def is_stationary(counts, window):
+    """
+    Tests whether a series has stopped drifting, by comparing the means of its last two windows
+    Args:
+        counts: (..., n) array of the series, n must be at least 2 * window
+        window: number of values in each window
+    Returns:
+        whether the difference of the means is within twice its standard error, for each series
+    """
+    counts = np.asarray(counts, dtype=float)
+    first = counts[..., -2 * window:-window]
+    second = counts[..., -window:]
+    error = np.sqrt((first.var(axis=-1) + second.var(axis=-1)) / window)
+    return np.abs(second.mean(axis=-1) - first.mean(axis=-1)) <= 2 * error
+
+
+def batch_error(counts, batches=BATCHES):
+    """
+    Standard error of the mean of a correlated series, from the spread of the means of consecutive batches
+    Args:
+        counts: (..., n) array of the series, n must be at least batches
+        batches: number of batches to split the series into
+    Returns:
+        the standard error of the mean of each series
+    """
+    counts = np.asarray(counts, dtype=float)
+    n = counts.shape[-1] // batches
+    means = counts[..., -n * batches:].reshape(counts.shape[:-1] + (batches, n)).mean(axis=-1)
+    return means.std(axis=-1, ddof=1) / np.sqrt(batches)
+
+
 class SIRS(CellularAutomata):
     """
     A Cellular automata model to simulate the spread of an infection through a population. Each cell can have one of
@@ -12,7 +49,8 @@ class SIRS(CellularAutomata):
     as the SIR model. The SIRS model introduces the probability for a return to susceptible after recovered.
     """
 
-    def __init__(self, shape: tuple, p1: float, p2: float, p3: float, susceptible=1, infected=2, immune=3):
+    def __init__(self, shape: tuple, p1: float, p2: float, p3: float, susceptible=1, infected=2, immune=3,
+                 seed=None, dtype=np.uint8):
         """
         Args:
             shape: the size of the grid
@@ -21,10 +59,12 @@ class SIRS(CellularAutomata):
             p3: Probability R->S
             susceptible: value to denote susceptible
             infected: value to denote infected
+            seed: seed of the random numbers, see Grid
+            dtype: integer type of the states, see Grid
 
             recovered will always be denoted by a 0
         """
-        super().__init__(shape, [susceptible, infected, immune])
+        super().__init__(shape, [susceptible, infected, immune], seed, dtype)
         self.p1 = p1
         self.p2 = p2
         self.p3 = p3
@@ -35,32 +75,66 @@ class SIRS(CellularAutomata):
             immunised: fraction of immunised people in the grid
         """
         x = (1-immunised)/3
-        self._array = np.random.choice(self.actors, self.shape, p=[x, x, x, immunised])
+        self._set_array(self.rng.choice(np.asarray(self.actors, dtype=self.dtype), self.shape, p=[x, x, x, immunised]))
 
-    def measure_infections(self, equilibrate_sweeps: int, measurements: int):
+    def measure_infections(self, equilibrate_sweeps: int, measurements: int, vectorised=False, adaptive=False,
+                           target_error=1e-3, window=20, census=False):
         """
         Args:
-            equilibrate_sweeps: the number of sweeps to perform before taking measurements
-            measurements: the number of measurements to make
+            equilibrate_sweeps: the number of sweeps to perform before taking measurements, the most performed if
+                                adaptive
+            measurements: the number of measurements to make, the most made if adaptive
+            vectorised: whether to use the vectorised sequential update
+            adaptive: whether to stop equilibrating once the number of infected is stationary, and stop measuring
+                      once the standard error of the mean infected fraction reaches target_error
+            target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+            window: number of sweeps between checks when adaptive
+            census: whether to also return the number of cells in every state at each measurement
 
-        Returns: the number of infected for each measurement
+        Returns: the number of infected for each measurement, p1, p3, and the number of equilibration and measurement
+                 sweeps performed. Measurements after the system is absorbed are 0 and if measuring stopped early only
+                 the measurements made are returned. With census, also the (measurements, states) number of each
+                 state indexed by its value, taken from the grid's running counts, which is NaN after absorption
         """
-        # first come to equilibrium
-        for _ in range(equilibrate_sweeps):
-            self.sequential_update(self.actors[2])
         infected = np.zeros(measurements)
+        states = np.full((measurements, max(self.actors) + 1), np.nan) if census else None
+        history = []
+        # first come to equilibrium
+        for i in range(equilibrate_sweeps):
+            self.sequential_update(self.actors[2], vectorised=vectorised)
+            history.append(self.count(self.actors[2]))
+            # once there are no infected there can never be any again
+            if history[-1] == 0:
+                return self._measured(infected, states, (i + 1, 0))
+            if adaptive and (i + 1) % window == 0 and i + 1 >= 2 * window and is_stationary(history, window):
+                break
+        equilibrated = len(history)
         # measure the number of infected
         for i in range(measurements):
-            self.sequential_update(self.actors[2])
+            self.sequential_update(self.actors[2], vectorised=vectorised)
             infected[i] = self.count(self.actors[2])
+            if census:
+                states[i] = self.counts()[:states.shape[1]]
             if infected[i] == 0:
-                break
-        return infected, self.p1, self.p3
+                return self._measured(infected, states, (equilibrated, i + 1))
+            if adaptive and (i + 1) % window == 0 and i + 1 >= MIN_MEASUREMENTS and \
+                    batch_error(infected[:i + 1]) / self.size <= target_error:
+                return self._measured(infected[:i + 1], None if states is None else states[:i + 1],
+                                      (equilibrated, i + 1))
+        return self._measured(infected, states, (equilibrated, measurements))
+
+    def _measured(self, infected, states, sweeps):
+        """
+        The results of measure_infections, with the census if it was taken
+        """
+        if states is None:
+            return infected, self.p1, self.p3, sweeps
+        return infected, self.p1, self.p3, sweeps, states
 
     def rules(self, c, neighbours):
         # check the state of the cell
         # roll a dice
-        p = np.random.random()
+        p = self.random()
         # the state is susceptible
         if c == self.actors[1]:
             # check if any of the neighbours around the cell are infected
@@ -90,3 +164,14 @@ class SIRS(CellularAutomata):
         # the state is immune
         elif c == self.actors[3]:
             return c
+
+    def sweep_rules(self, c, neighbours, p):
+        recovered, susceptible, infected, immune = self.actors
+        new = c.copy()
+        # susceptible cells with an infected neighbour become infected
+        new[(c == susceptible) & (neighbours > 0) & (p <= self.p1)] = infected
+        # infected cells recover
+        new[(c == infected) & (p <= self.p2)] = recovered
+        # recovered cells become susceptible again, immune cells never change
+        new[(c == recovered) & (p <= self.p3)] = susceptible
+        return new
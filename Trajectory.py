@@ -0,0 +1,236 @@
+import json
+import os
+import numpy as np
+from Checkpoint import atomic_write
+
+
+class Trajectory:
+    """
+    Recording of every generation or sweep of a run on disk, so observables can be measured afterwards without
+    running the model again. Frames are appended to raw memory mapped files in the grid's own compact dtype, which
+    are grown by extending the file rather than copying. The number of frames is recorded in meta.json by flush,
+    so frames appended after the last flush of an interrupted run are never seen.
+    In 'delta' mode only a keyframe of the whole grid is kept every keyframe frames, and each other frame is kept as
+    the flat indices and new values of the cells which changed since the one before, which is much smaller for
+    runs where few cells change per step.
+    Args:
+        directory: where the trajectory is kept
+        shape: the shape of the grid, needed to create a new trajectory
+        dtype: the type of the states, needed to create a new trajectory
+        mode: 'full' or 'delta', for a new trajectory
+        keyframe: number of frames between keyframes in delta mode
+        capacity: number of frames to allocate space for at first, doubled whenever it is full
+        sync: number of appends between flushes, 0 to only flush when asked or closed
+    """
+    modes = ('full', 'delta')
+
+    def __init__(self, directory, shape=None, dtype=None, mode='full', keyframe=64, capacity=256, sync=1024):
+        self.directory = directory
+        self.sync = sync
+        meta = os.path.join(directory, 'meta.json')
+        if os.path.isfile(meta):
+            with open(meta) as infile:
+                self._meta = json.load(infile)
+        elif shape is None or dtype is None:
+            raise FileNotFoundError(f"No trajectory in {directory}")
+        elif mode not in self.modes:
+            raise ValueError(f"Unknown mode {mode}, expected one of {self.modes}")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._meta = {'shape': list(shape), 'dtype': np.dtype(dtype).str, 'mode': mode, 'keyframe': keyframe,
+                          'count': 0, 'lengths': {}}
+        self.shape = tuple(self._meta['shape'])
+        self.dtype = np.dtype(self._meta['dtype'])
+        self.mode = self._meta['mode']
+        self.keyframe = self._meta['keyframe']
+        # name of each file, the type of its rows and the shape of one row
+        frame = (self.dtype, self.shape)
+        self._layout = {'frames': frame} if self.mode == 'full' else \
+            {'keyframes': frame, 'offsets': (np.dtype(np.int64), ()), 'cells': (np.dtype(np.uint32), ()),
+             'values': (self.dtype, ())}
+        self._maps = {}
+        for name in self._layout:
+            self._meta['lengths'].setdefault(name, 0)
+            self._open(name, max(capacity, self._meta['lengths'][name]))
+        self._previous = None
+        if self.mode == 'delta':
+            if self._meta['lengths']['offsets'] == 0:
+                self._push('offsets', np.zeros(1, dtype=np.int64))
+            if len(self):
+                self._previous = self[len(self) - 1].ravel().copy()
+                self._changed = np.zeros(self._previous.shape, dtype=bool)
+        if not os.path.isfile(meta):
+            self.flush()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def _open(self, name, capacity):
+        """
+        Maps a file with room for capacity rows, extending the file if it is smaller
+        """
+        dtype, shape = self._layout[name]
+        nbytes = capacity * int(np.prod(shape, dtype=int)) * dtype.itemsize
+        path = self._path(name)
+        with open(path, 'ab') as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        self._maps[name] = np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,) + shape)
+
+    def _push(self, name, rows):
+        """
+        Appends rows to a file, growing it as needed
+        """
+        n = self._meta['lengths'][name]
+        column = self._maps[name]
+        if n + len(rows) > len(column):
+            column.flush()
+            del column
+            self._open(name, max(2 * len(self._maps[name]), n + len(rows)))
+            column = self._maps[name]
+        column[n:n + len(rows)] = rows
+        self._meta['lengths'][name] = n + len(rows)
+
+    def __len__(self):
+        return self._meta['count']
+
+    def append(self, array):
+        """
+        Appends the next frame
+        Args:
+            array: the grid, e.g. automaton.array
+        """
+        array = np.asarray(array)
+        if array.shape != self.shape:
+            raise ValueError(f"Expected a frame of shape {self.shape}, got {array.shape}")
+        count = self._meta['count']
+        if self.mode == 'full':
+            self._push('frames', array[None])
+        elif count % self.keyframe == 0:
+            self._push('keyframes', array[None])
+            self._push('offsets', np.array(self._maps['offsets'][count:count + 1]))
+            self._previous = array.ravel().astype(self.dtype)
+            self._changed = np.zeros(self._previous.shape, dtype=bool)
+        else:
+            flat = array.ravel()
+            np.not_equal(flat, self._previous, out=self._changed)
+            changed = np.flatnonzero(self._changed)
+            self._push('cells', changed)
+            self._push('values', flat[changed])
+            self._push('offsets', np.array(self._maps['offsets'][count:count + 1]) + len(changed))
+            np.copyto(self._previous, flat)
+        self._meta['count'] = count + 1
+        if self.sync and self._meta['count'] % self.sync == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the frames to disk and records them in meta.json
+        """
+        for column in self._maps.values():
+            column.flush()
+        atomic_write(os.path.join(self.directory, 'meta.json'), json.dumps(self._meta))
+
+    def close(self):
+        self.flush()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _apply(self, flat, i):
+        """
+        Applies the changes of delta frame i to a flat grid in place
+        """
+        offsets = self._maps['offsets']
+        start, end = offsets[i], offsets[i + 1]
+        flat[self._maps['cells'][start:end]] = self._maps['values'][start:end]
+
+    def __getitem__(self, i):
+        """
+        Returns a copy of frame i
+        """
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"Frame {i} out of range for a trajectory of {len(self)} frames")
+        i %= len(self)
+        if self.mode == 'full':
+            return np.array(self._maps['frames'][i])
+        k = i // self.keyframe
+        flat = np.array(self._maps['keyframes'][k]).ravel()
+        for j in range(k * self.keyframe + 1, i + 1):
+            self._apply(flat, j)
+        return flat.reshape(self.shape)
+
+    def frames(self, start=0, stop=None):
+        """
+        Replays the frames in order. Delta frames are applied one after another rather than each rebuilt from its
+        keyframe
+        Args:
+            start: first frame
+            stop: frame to stop before, defaults to the end
+        Returns:
+            generator of the frames. In delta mode every frame is the same array updated in place, copy it to keep it
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if self.mode == 'full':
+            for i in range(start, stop):
+                yield self._maps['frames'][i]
+            return
+        if start >= stop:
+            return
+        flat = self[start].ravel()
+        frame = flat.reshape(self.shape)
+        yield frame
+        for i in range(start + 1, stop):
+            if i % self.keyframe == 0:
+                flat[:] = self._maps['keyframes'][i // self.keyframe].ravel()
+            else:
+                self._apply(flat, i)
+            yield frame
+
+    def __iter__(self):
+        return self.frames()
+
+    def map(self, observable, start=0, stop=None):
+        """
+        Measures an observable of every frame
+        Args:
+            observable: function of a frame, e.g. lambda frame: np.count_nonzero(frame == 2)
+            start: first frame
+            stop: frame to stop before, defaults to the end
+        Returns:
+            array of the observable at each frame
+        """
+        return np.array([observable(frame) for frame in self.frames(start, stop)])
+
+    @property
+    def nbytes(self):
+        """
+        bytes of the recorded frames on disk
+        """
+        return sum(self._meta['lengths'][name] * int(np.prod(shape, dtype=int)) * dtype.itemsize
+                   for name, (dtype, shape) in self._layout.items())
+
+    @classmethod
+    def record(cls, directory, automaton, steps, step, **options):
+        """
+        Records a run of an automaton, the current state followed by the state after each step
+        Args:
+            directory: where to keep the trajectory
+            automaton: the Grid to record
+            steps: number of steps to run
+            step: function advancing the automaton one step, e.g. lambda: G.update(1)
+            options: options of the trajectory, e.g. mode='delta'
+        Returns:
+            the trajectory
+        """
+        trajectory = cls(directory, automaton.shape, automaton.dtype, **options)
+        trajectory.append(automaton.array)
+        for _ in range(steps):
+            step()
+            trajectory.append(automaton.array)
+        trajectory.flush()
+        return trajectory
@@ -0,0 +1,172 @@
+"""
+Benchmarks for the update engines. Run with the name of a benchmark e.g.
+    python benchmark.py parallel --sizes 4096 8192
+"""
+import argparse
+import os
+import pickle
+import time
+import tracemalloc
+import numpy as np
+import scipy.ndimage
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from GameOfLife import GameOfLife
+from SIRS import SIRS
+from ParallelUpdate import ParallelUpdate
+from NeighbourCounter import NeighbourCounter, MOORE, VON_NEUMANN
+from tasks import TaskPool, spec
+from Ensemble import chunk
+
+
+def parallel_scaling(sizes=(4096, 8192, 16384, 32768), workers=None, steps=10):
+    """
+    Measures the throughput of ParallelUpdate on Game of Life boards from 1 core up to the given number of workers
+    Args:
+        sizes: side lengths of the square boards to test
+        workers: largest number of workers, defaults to the number of cores
+        steps: number of generations to time
+    """
+    workers = workers or os.cpu_count()
+    counts = sorted({1, workers} | {2 ** i for i in range(workers.bit_length()) if 2 ** i <= workers})
+    table = GameOfLife((3, 3)).compile_rules(MOORE)
+    for n in sizes:
+        array = np.random.randint(0, 2, (n, n), dtype=np.uint8)
+        base = None
+        for w in counts:
+            with ParallelUpdate(array, table, workers=w) as P:
+                P.update(1)
+                start = time.perf_counter()
+                P.update(steps)
+                elapsed = time.perf_counter() - start
+            rate = n * n * steps / elapsed
+            base = base or rate
+            print(f"{n}x{n} {w:>3} workers: {rate / 1e6:8.1f} Mcells/s  speedup {rate / base:5.2f}")
+        del array
+
+
+def ipc_overhead(shape=(50, 50), tasks=200, sweeps=3, workers=None):
+    """
+    Compares submitting constructed SIRS objects to a fresh pool per sweep, as the sweeps used to, with sending task
+    specs in batches to one warm TaskPool. Each task makes no measurements so the time is all overhead
+    Args:
+        shape: size of the grid of each task
+        tasks: number of tasks in each sweep
+        sweeps: number of sweeps to run
+        workers: number of worker processes, defaults to the number of cores
+    """
+    workers = workers or os.cpu_count()
+    S = SIRS(shape, 0.5, 0.5, 0.5)
+    S.randomise(0)
+    old_bytes = len(pickle.dumps((S.measure_infections, (0, 0))))
+    start = time.perf_counter()
+    for _ in range(sweeps):
+        with ProcessPoolExecutor(workers) as e:
+            futures = []
+            for _ in range(tasks):
+                S = SIRS(shape, 0.5, 0.5, 0.5)
+                S.randomise(0)
+                futures.append(e.submit(S.measure_infections, 0, 0))
+            for f in as_completed(futures):
+                f.result()
+    old = (time.perf_counter() - start) / (sweeps * tasks)
+
+    specs = [spec('infections', shape=shape, p=(0.5, 0.5, 0.5), f_immune=0, equilibrate=0, measurements=0)
+             for _ in range(tasks)]
+    batches = chunk(specs, workers * 4)
+    new_bytes = sum(len(pickle.dumps(b)) for b in batches) / tasks
+    start = time.perf_counter()
+    with TaskPool(workers) as pool:
+        for _ in range(sweeps):
+            for _ in pool.run(specs):
+                pass
+    new = (time.perf_counter() - start) / (sweeps * tasks)
+    print(f"{shape[0]}x{shape[1]} grid, {tasks} tasks x {sweeps} sweeps on {workers} workers")
+    print(f"bound methods, pool per sweep: {old_bytes:8.0f} bytes/task  {old * 1e3:7.2f} ms/task")
+    print(f"specs, warm pool:              {new_bytes:8.0f} bytes/task  {new * 1e3:7.2f} ms/task")
+
+
+def compact_states(sizes=(256, 1024, 4096), steps=10):
+    """
+    Compares the memory and throughput of Game of Life updates with the states stored as int64, as they used to be,
+    and as the default uint8. The peak is the most memory allocated during one update
+    Args:
+        sizes: side lengths of the square boards to test
+        steps: number of generations to time
+    """
+    for n in sizes:
+        for dtype in (np.int64, np.uint8):
+            G = GameOfLife((n, n), seed=0, dtype=dtype)
+            G.randomise()
+            G.update(1)
+            tracemalloc.start()
+            G.update(1)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            start = time.perf_counter()
+            for _ in range(steps):
+                G.update(1)
+            rate = n * n * steps / (time.perf_counter() - start)
+            print(f"{n}x{n} {np.dtype(dtype).name:>5}: grid {G.array.nbytes / 2 ** 20:8.2f} MiB  "
+                  f"update peak {peak / 2 ** 20:8.2f} MiB  {rate / 1e6:7.1f} Mcells/s")
+
+
+def neighbour_counting(sizes=(256, 1024, 4096), steps=10):
+    """
+    Compares counting Moore and von Neumann neighbours by convolving with scipy, as get_neighbours_of_value used to,
+    with the preallocated halo buffers of NeighbourCounter. The peak is the most memory allocated during one count
+    Args:
+        sizes: side lengths of the square boards to test
+        steps: number of counts to time
+    """
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        array = rng.integers(2, size=(n, n), dtype=np.uint8)
+        for name, weight in (('moore', MOORE), ('von neumann', VON_NEUMANN)):
+            counter = NeighbourCounter((n, n), weight)
+            methods = {'scipy': lambda: scipy.ndimage.convolve((array == 1).astype(np.uint8), weight,
+                                                                output=np.uint8, mode='wrap'),
+                       'halo': lambda: counter.count(array, 1)}
+            for method, count in methods.items():
+                count()
+                tracemalloc.start()
+                count()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                start = time.perf_counter()
+                for _ in range(steps):
+                    count()
+                elapsed = (time.perf_counter() - start) / steps
+                print(f"{n}x{n} {name:>11} {method:>5}: {elapsed * 1e3:8.2f} ms  peak {peak / 2 ** 10:10.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+    p = sub.add_parser('parallel', help="scaling of ParallelUpdate from 1 to N cores")
+    p.add_argument('--sizes', type=int, nargs='+', default=[4096, 8192, 16384, 32768])
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--steps', type=int, default=10)
+    p = sub.add_parser('ipc', help="bytes sent and overhead per task of the measurement pools")
+    p.add_argument('--size', type=int, nargs=2, default=[50, 50])
+    p.add_argument('--tasks', type=int, default=200)
+    p.add_argument('--sweeps', type=int, default=3)
+    p.add_argument('--workers', type=int, default=None)
+    p = sub.add_parser('neighbours', help="neighbour counting with halo buffers against scipy")
+    p.add_argument('--sizes', type=int, nargs='+', default=[256, 1024, 4096])
+    p.add_argument('--steps', type=int, default=10)
+    p = sub.add_parser('dtype', help="memory and throughput of compact uint8 states against int64")
+    p.add_argument('--sizes', type=int, nargs='+', default=[256, 1024, 4096])
+    p.add_argument('--steps', type=int, default=10)
+    args = parser.parse_args()
+    if args.benchmark == 'parallel':
+        parallel_scaling(args.sizes, args.workers, args.steps)
+    elif args.benchmark == 'ipc':
+        ipc_overhead(tuple(args.size), args.tasks, args.sweeps, args.workers)
+    elif args.benchmark == 'neighbours':
+        neighbour_counting(args.sizes, args.steps)
+    elif args.benchmark == 'dtype':
+        compact_states(args.sizes, args.steps)
+
+
+if __name__ == "__main__":
+    main()
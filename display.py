@@ -3,15 +3,13 @@ from tkinter import ttk
 from matplotlib import colors
 from GameOfLife import GameOfLife
 from SIRS import SIRS
+from ResultsStore import ResultsStore
+import measurements
 from matplotlib import pyplot as plt
 import matplotlib.patches as mpatches
-import numpy as np
-import pickle
 import os.path
-from concurrent.futures import ProcessPoolExecutor, as_completed
 import threading
 import sys
-from scipy.stats import sem
 
 class EntryWithPlaceholder(tk.Entry):
     def __init__(self, master=None, placeholder="PLACEHOLDER", color='grey'):
@@ -69,8 +67,7 @@ class GoLFrame(tk.Frame):
 
     def speed(self):
         params = self.O.get_params()
-        G = GameOfLife((params['x'], params['y']))
-        v = G.glider_CoM(params['measurements'])
+        v = measurements.glider_speed((params['x'], params['y']), params['measurements'])
         self.speedval.configure(state='normal')
         self.speedval.insert(1.0, str(round(v, 2)))
         self.speedval.configure(state='disabled')
@@ -91,7 +88,8 @@ class GoLFrame(tk.Frame):
         alive_patch = mpatches.Patch(color=params['fg_colour'], label="Alive")
         dead_patch = mpatches.Patch(color=params['bg_colour'], label="Dead")
         patches = [alive_patch, dead_patch]
-        G.animateCoM(params['fg_colour'], params['bg_colour'], params['steps'], "Game of Life", patches, 1, 1)
+        G.animateCoM(params['fg_colour'], params['bg_colour'], params['steps'], "Game of Life", patches, 1, 1,
+                     steps_per_frame=params['steps_per_frame'])
 
     def measure(self):
         """
@@ -100,23 +98,13 @@ class GoLFrame(tk.Frame):
         """
         self.progressbar.grid(column=0, row=9, columnspan=2)
         params = self.O.get_params()
-        steps = []
-        tasks = []
-        with ProcessPoolExecutor() as e:
-            for i in range(params['measurements']):
-                G = GameOfLife((params['x'], params['y']))
-                G.randomise()
-                tasks.append(e.submit(G.find_equilibrium, 1, 1))
-            progress = 0
-            for t in as_completed(tasks):
-                progress += 1
-                x = progress/len(tasks)*100
-                self.progressbar['value'] = x
-                steps.append(t.result())
+
+        def progress(done, total, key):
+            self.progressbar['value'] = done/total*100
+
+        measurements.equilibrium((params['x'], params['y']), params['measurements'], progress=progress, exact=True)
         print("done")
         self.progressbar.grid_forget()
-        with open('equilibrium.txt', 'w') as outfile:
-            outfile.write(','.join(map(str, steps)))
         sys.exit()
 
     def begin(self):
@@ -135,7 +123,8 @@ class GoLFrame(tk.Frame):
         alive_patch = mpatches.Patch(color=params['fg_colour'], label="Alive")
         dead_patch = mpatches.Patch(color=params['bg_colour'], label="Dead")
         patches = [alive_patch, dead_patch]
-        G.animate(params['fg_colour'], params['bg_colour'], params['steps'], "Game of Life", patches, 1)
+        G.animate(params['fg_colour'], params['bg_colour'], params['steps'], "Game of Life", patches, 1,
+                  steps_per_frame=params['steps_per_frame'])
 
 
 class SIRSFrame(tk.Frame):
@@ -221,7 +210,8 @@ class SIRSFrame(tk.Frame):
         else:
             patches = [susceptible_patch, infected_patch, recovered_patch]
             cols = [params['fg_colour'], params['inf_colour']]
-        S.animate(cols, params['bg_colour'], params['steps'], "SIRS", patches, 2, update_method='s')
+        S.animate(cols, params['bg_colour'], params['steps'], "SIRS", patches, 2, update_method='s',
+                  steps_per_frame=params['steps_per_frame'])
 
     def variance_precise(self):
         """
@@ -230,47 +220,17 @@ class SIRSFrame(tk.Frame):
         self.progressbar.grid(row=7, column=0, columnspan=2)
         self.progressbar['value'] = 0
         params = self.O.get_params()
-        size = params['x'] * params['y']
-        p1s = np.round(np.arange(0.2, 0.5, params['precision']), 3)
-        p2 = 0.5
-        p3 = 0.5
-        self.p2.set(p2)
-        self.p3.set(p3)
+        self.p2.set(0.5)
+        self.p3.set(0.5)
         f_immune = float(self.f_immune.get())
-        var = []
-        error = []
-        tasks = []
-        with ProcessPoolExecutor() as e:
-            for p1 in p1s:
-                self.p1.set(p1)
-                S = SIRS((params['x'], params['y']), p1, p2, p3)
-                S.randomise(f_immune)
-                tasks.append(e.submit(S.measure_infections, 100, params['measurements']))
-            progress = 0
-            for t in as_completed(tasks):
-                progress += 1
-                self.progressbar['value'] = progress/len(tasks)*100
-                inf = t.result()[0]
-                av_inf = np.mean(inf)
-                av_inf_squared = np.mean(np.power(inf, 2))
-                var.append(round((av_inf_squared-av_inf)/size, 3))
-                # calculate errors using bootstrap method and 1000 resamples
-                xs = []
-                for _ in range(1000):
-                    resamples = np.random.choice(inf, len(inf))
-                    av = np.mean(resamples)
-                    av_squared = np.mean(np.power(resamples, 2))
-                    xs.append((av_squared-av)/S.size)
-                x_squares = np.power(xs, 2)
-                av_x = np.mean(xs)
-                av_x2 = np.mean(x_squares)
-                error.append(round((av_x2 - av_x ** 2) ** 0.5, 3))
+
+        def progress(done, total, key):
+            self.progressbar['value'] = done/total*100
+            self.p1.set(key[0])
+
+        measurements.variance((params['x'], params['y']), f_immune, params['measurements'], params['precision'],
+                              progress=progress)
         self.progressbar.grid_forget()
-        with open("SIRSVar.txt", 'w') as outfile:
-            out = ','.join(map(str, p1s))+'\n'
-            out += ','.join(map(str, var))+'\n'
-            out += ','.join(map(str, error))
-            outfile.write(out)
         sys.exit()
 
     def measure_infections(self):
@@ -280,33 +240,17 @@ class SIRSFrame(tk.Frame):
         params = self.O.get_params()
         self.progressbar.grid(row=7, column=0, columnspan=2)
         self.progressbar['value'] = 0
-        p1s = np.round(np.arange(0, 1, params['precision']), 3)
-        p3s = np.round(np.arange(0, 1, params['precision']), 3)
         p2 = 0.5
         self.p2.set(p2)
         f_immune = float(self.f_immune.get())
-        data = {p1: {p3: {'val': 0, 'var': 0} for p3 in p3s} for p1 in p1s}
-        tasks = []
-        with ProcessPoolExecutor() as e:
-            for p1 in p1s:
-                for p3 in p3s:
-                    S = SIRS((params['x'], params['y']), p1, p2, p3)
-                    S.randomise(f_immune)
-                    tasks.append(e.submit(S.measure_infections, 100, params['measurements']))
-            progress = 0
-            for f in as_completed(tasks):
-                progress += 1
-                self.progressbar['value'] = progress/len(tasks)*100
-                inf, p1, p3 = f.result()
-                self.p1.set(p1)
-                self.p3.set(p3)
-                av_inf = np.mean(inf)
-                av_inf_squared = np.mean(np.power(inf, 2))
-
-                data[p1][p3]['val'] = round(av_inf/S.size, 3)
-                data[p1][p3]['var'] = round((av_inf_squared-av_inf)/S.size, 3)
-        with open("SIRSMeasurements", 'wb') as outfile:
-            pickle.dump(data, outfile)
+
+        def progress(done, total, key):
+            self.progressbar['value'] = done/total*100
+            self.p1.set(key[0])
+            self.p3.set(key[1])
+
+        measurements.phase_diagram((params['x'], params['y']), f_immune, params['measurements'], params['precision'],
+                                   p2, progress=progress)
         self.progressbar.grid_forget()
         sys.exit()
 
@@ -321,33 +265,14 @@ class SIRSFrame(tk.Frame):
         p2 = float(self.p2.get())
         p3 = float(self.p3.get())
         runs = int(self.runs.get())
-        f_immune = np.arange(0, 1, params['precision'])
-        infs = []
-        errors = []
-        tasks = []
-        with ProcessPoolExecutor() as e:
-            progress = 0
-            for f in f_immune:
-                self.f_immune.set(f)
-                progress += 1
-                self.progressbar['value'] = progress/len(f_immune)*100
-                x = []
-                for _ in range(runs):
-                    S = SIRS((params['x'], params['y']), p1, p2, p3)
-                    S.randomise(f)
-                    tasks.append(e.submit(S.measure_infections, 100, params['measurements']))
-                for t in as_completed(tasks):
-                    x.append(np.mean(t.result()[0]))
-                infs.append(np.mean(x))
-                errors.append(sem(x))
-        self.progressbar.grid_forget()
 
-        with open(f"Immune({p1},{p2},{p3}).txt", 'w') as outfile:
-            out = ','.join(map(str, f_immune))+'\n'
-            out += ','.join((map(str, infs)))+'\n'
-            out += ','.join((map(str, errors)))
+        def progress(done, total, key):
+            self.f_immune.set(key[0])
+            self.progressbar['value'] = done/total*100
 
-            outfile.write(out)
+        measurements.immunity((params['x'], params['y']), p1, p2, p3, runs, params['measurements'],
+                              params['precision'], progress=progress)
+        self.progressbar.grid_forget()
         sys.exit()
 
 
@@ -376,6 +301,8 @@ class OptionsFrame(tk.Frame):
         self.immuneColMenu.current(3)
         self.steps = tk.Scale(self, label="Display Steps", from_=500, to_=10_000, resolution=500, orient=tk.HORIZONTAL)
         self.steps.set(1000)
+        self.steps_per_frame = tk.Scale(self, label="Steps per Frame", from_=1, to_=50, orient=tk.HORIZONTAL)
+        self.steps_per_frame.set(1)
         self.measurements = tk.Scale(self, label="Measurement Sweeps", from_=100, to_=10_000, resolution=100,
                                      orient=tk.HORIZONTAL, length=150)
         self.measurements.set(100)
@@ -398,11 +325,13 @@ class OptionsFrame(tk.Frame):
         self.steps.grid(column=0, row=6, columnspan=2)
         self.measurements.grid(column=0, row=7, columnspan=2)
         self.precision.grid(column=0, row=8, columnspan=2)
-        self.ApplyButton.grid(column=0, row=9, pady=50)
+        self.steps_per_frame.grid(column=0, row=9, columnspan=2)
+        self.ApplyButton.grid(column=0, row=10, pady=50)
         self.params = {'x': int(self.ex.get()), 'y': int(self.ey.get()), 'bg_colour': self.BgColMenu.get(),
                        'fg_colour': self.ColMenu.get(), 'inf_colour': self.infMenu.get(),
                        'im_colour': self.immuneColMenu.get(), 'steps': int(self.steps.get()),
-                       'measurements': int(self.measurements.get()), 'precision': float(self.precision.get())}
+                       'measurements': int(self.measurements.get()), 'precision': float(self.precision.get()),
+                       'steps_per_frame': int(self.steps_per_frame.get())}
 
     def get_params(self):
         return self.params
@@ -411,7 +340,8 @@ class OptionsFrame(tk.Frame):
         self.params = {'x': int(self.ex.get()), 'y': int(self.ey.get()), 'bg_colour': self.BgColMenu.get(),
                        'fg_colour': self.ColMenu.get(), 'inf_colour': self.infMenu.get(),
                        'im_colour': self.immuneColMenu.get(), 'steps': int(self.steps.get()),
-                       'measurements': int(self.measurements.get()), 'precision': float(self.precision.get())}
+                       'measurements': int(self.measurements.get()), 'precision': float(self.precision.get()),
+                       'steps_per_frame': int(self.steps_per_frame.get())}
 
 
 class GraphFrame(tk.Frame):
@@ -457,7 +387,7 @@ class GraphFrame(tk.Frame):
         if os.path.isfile("glidercom.txt"):
             graphs.append("Game of Life Glider Plot")
         # check if data for SIRS heatmap is available
-        if os.path.isfile("SIRSMeasurements"):
+        if ResultsStore.exists("SIRSResults") or os.path.isfile("SIRSMeasurements"):
             graphs.append("SIRS heat-map")
             graphs.append("SIRS contour")
         if os.path.isfile("SIRSVar.txt"):
@@ -486,13 +416,24 @@ class GraphFrame(tk.Frame):
         plt.title("Glider Centre-of-Mass")
         plt.show()
 
+    @staticmethod
+    def SIRS_results():
+        """
+        Opens the phase diagram results, converting results saved by older versions if needed
+        """
+        if not ResultsStore.exists("SIRSResults"):
+            return ResultsStore.from_pickle("SIRSMeasurements", "SIRSResults")
+        return ResultsStore("SIRSResults")
+
     def SIRS_heatmap(self):
-        with open("SIRSMeasurements", 'rb') as infile:
-            data = pickle.load(infile)
-        xs = list(data)
-        ys = list(data[0])
-        im = [[data[x][y]['val'] for y in ys] for x in xs]
-        plt.imshow(im)
+        store = self.SIRS_results()
+        if store.is_grid():
+            xs, ys, im = store.grid('val')
+            plt.imshow(im)
+        else:
+            # points from a refined sweep are scattered so are interpolated over a triangulation
+            plt.tricontourf(store['p1'], store['p3'], store['val'], levels=20)
+            plt.colorbar()
         plt.xlabel("p1")
         plt.ylabel("p3")
         plt.title("SIRS p1-p3 Phase diagram")
@@ -500,12 +441,12 @@ class GraphFrame(tk.Frame):
         plt.show()
 
     def SIRS_contor(self):
-        with open("SIRSMeasurements",'rb') as infile:
-            data = pickle.load(infile)
-        xs = list(data)
-        ys = list(data[0])
-        zs = [[data[x][y]['var'] for y in ys] for x in xs]
-        cs = plt.contour(xs, ys, zs)
+        store = self.SIRS_results()
+        if store.is_grid():
+            xs, ys, zs = store.grid('var')
+            cs = plt.contour(xs, ys, zs)
+        else:
+            cs = plt.tricontour(store['p1'], store['p3'], store['var'])
         plt.clabel(cs,inline=1,fontsize=10)
         plt.xlabel("p1")
         plt.ylabel("p3")
@@ -0,0 +1,102 @@
+import numpy as np
+
+# most resampled values held in memory at once by bootstrap
+MAX_ELEMENTS = 1 << 22
+
+
+def mean(samples, axis=-1):
+    return np.mean(samples, axis=axis)
+
+
+def infected_variance(samples, size, axis=-1):
+    """
+    Variance of the infected population per cell as measured by the SIRS sweeps
+    Args:
+        samples: number of infected at each measurement
+        size: number of cells in the grid
+        axis: axis of the measurements
+    """
+    av = np.mean(samples, axis=axis)
+    return (np.mean(np.power(samples, 2), axis=axis) - av) / size
+
+
+def _blocks(series, block):
+    """
+    Splits a series into (blocks, block) consecutive blocks, dropping the start if it doesn't divide evenly
+    """
+    series = np.asarray(series, dtype=float)
+    n = len(series) // block
+    return series[len(series) - n * block:].reshape(n, block)
+
+
+def bootstrap(series, statistic=mean, resamples=1000, block=1, rng=None):
+    """
+    Bootstrap error of a statistic of a series. Every resample is drawn at once as one array of indices, in batches
+    to bound memory, rather than one at a time. Resampling whole blocks of consecutive measurements keeps the
+    correlation between them
+    Args:
+        series: 1D array of measurements
+        statistic: function of an array of samples and an axis, e.g. mean
+        resamples: number of resamples
+        block: number of consecutive measurements resampled together
+        rng: numpy Generator or seed to draw the resamples with, fresh entropy if not given
+    Returns:
+        the standard deviation of the statistic over the resamples
+    """
+    rng = np.random.default_rng(rng)
+    blocks = _blocks(series, block)
+    n = len(blocks)
+    if n < 2:
+        return 0.0
+    batch = max(1, MAX_ELEMENTS // (n * block))
+    values = []
+    for start in range(0, resamples, batch):
+        idx = rng.integers(n, size=(min(batch, resamples - start), n))
+        values.append(statistic(blocks[idx].reshape(len(idx), -1), axis=-1))
+    return float(np.std(np.concatenate(values)))
+
+
+def jackknife(series, statistic=mean, blocks=20):
+    """
+    Jackknife error of a statistic of a series, leaving out one block of consecutive measurements at a time so the
+    correlation between them is kept. All the leave-one-out samples are evaluated as one array
+    Args:
+        series: 1D array of measurements
+        statistic: function of an array of samples and an axis, e.g. mean
+        blocks: number of blocks to split the series into
+    Returns:
+        the jackknife standard error of the statistic
+    """
+    blocks = min(blocks, len(series))
+    if blocks < 2:
+        return 0.0
+    b = _blocks(series, len(series) // blocks)
+    # the series splits into at least as many blocks as asked for when they don't divide it evenly
+    n = len(b)
+    keep = np.arange(n - 1)[None, :] + (np.arange(n - 1)[None, :] >= np.arange(n)[:, None])
+    values = statistic(b[keep].reshape(n, -1), axis=-1)
+    return float(np.sqrt((n - 1) * np.mean(np.power(values - np.mean(values), 2))))
+
+
+def blocking(series):
+    """
+    Standard error of the mean of a correlated series by the blocking method of Flyvbjerg and Petersen. Neighbouring
+    measurements are averaged in pairs until the naive standard error stops growing within its own error
+    Args:
+        series: 1D array of measurements
+    Returns:
+        the standard error of the mean
+    """
+    x = np.asarray(series, dtype=float)
+    if len(x) < 2:
+        return 0.0
+    error = np.sqrt(np.var(x) / (len(x) - 1))
+    while len(x) >= 4:
+        x = 0.5 * (x[:len(x) // 2 * 2:2] + x[1:len(x) // 2 * 2:2])
+        n = len(x)
+        new = np.sqrt(np.var(x) / (n - 1))
+        # the estimate has reached its plateau once the growth is within its uncertainty
+        if new - error <= error / np.sqrt(2 * (n - 1)):
+            return float(max(error, new))
+        error = new
+    return float(error)
@@ -0,0 +1,416 @@
+"""
+Runs the measurements of the UI without it, for headless machines and scripts. Output files are the same as those
+written by the UI. Run with the name of a measurement e.g.
+    python measurements.py phase --size 50 50 --sweeps 1000 --precision 0.05 --workers 8
+or with a JSON config file of the same options e.g. {"measurement": "phase", "size": [50, 50], "sweeps": 1000}
+    python measurements.py --config phase.json
+Options given on the command line override those in the config file.
+The variance, phase, refine and immune measurements keep each completed point in a checkpoint under checkpoints/
+until their output is written, then delete it. Running an interrupted measurement again with the same options
+resumes it with the seed it started with, given no --seed or the same one.
+"""
+import argparse
+import json
+import os
+import numpy as np
+from functools import partial
+from scipy.stats import sem
+from error_analysis import bootstrap, blocking, infected_variance
+from GameOfLife import GameOfLife
+from Ensemble import chunk
+from tasks import spec, seeds, shared_pool
+from Checkpoint import Checkpoint, atomic_write
+from ResultsStore import save_phase_diagram
+
+
+def _report(progress, done, total, key):
+    if progress is not None:
+        progress(done, total, key)
+
+
+def _mode(adaptive, target_error, vectorised=False):
+    """
+    Suffix of the checkpoint of a measurement, keeping adaptive results apart from fixed length ones and vectorised
+    sweeps apart from sequential ones, as they draw different random numbers from the same seed
+    """
+    return (f"_adaptive{target_error}" if adaptive else "") + ("_vectorised" if vectorised else "")
+
+
+def equilibrium(shape, measurements, workers=None, progress=None, pool=None, seed=None, exact=False):
+    """
+    Measures the number of steps random Game of Life grids take to reach equilibrium, written to equilibrium.txt
+    for a histogram. The grids are split into a few ensembles, each advanced as one stacked array by a worker
+    Args:
+        shape: the size of the grid
+        measurements: number of grids to measure
+        workers: number of worker processes, defaults to the number of cores
+        progress: optional function called with (done, total, key) as each measurement completes
+        pool: TaskPool to run on, defaults to the shared pool of workers processes
+        seed: root seed of the random numbers, fresh entropy if not given. The same seed repeats the measurement
+        exact: whether to measure the exact step each grid reaches a fixed point or cycle, see
+               CellularAutomata.find_cycle, rather than when its population settles. Grids which don't are left out
+    Returns:
+        list of the number of steps of each grid
+    """
+    steps = []
+    done = 0
+    pool = pool or shared_pool(workers)
+    sizes = [len(c) for c in np.array_split(np.arange(measurements), pool.workers * pool.batches_per_worker) if len(c)]
+    specs = [spec('life_ensemble', s, shape=shape, boards=n, exact=exact)
+             for s, n in zip(seeds(len(sizes), seed), sizes)]
+    for _, result in pool.run(specs):
+        done += len(result)
+        steps.extend(s for s in result if s is not None)
+        _report(progress, done, measurements, None)
+    atomic_write('equilibrium.txt', ','.join(map(str, steps)))
+    return steps
+
+
+def glider_speed(shape, steps):
+    """
+    Measures the speed of a glider, writing its centre of mass over time to glidercom.txt
+    Args:
+        shape: the size of the grid
+        steps: largest number of steps to follow the glider for
+    Returns:
+        the speed of the glider in cells per step
+    """
+    return GameOfLife(shape).glider_CoM(steps)
+
+
+def variance(shape, f_immune, measurements, precision, equilibrate=100, workers=None, progress=None, adaptive=False,
+             target_error=1e-3, pool=None, seed=None, vectorised=False):
+    """
+    Measures the variance of the infected population over p1 from 0.2 to 0.5 with p2 = p3 = 0.5, written to
+    SIRSVar.txt with bootstrap errors
+    Args:
+        shape: the size of the grid
+        f_immune: fraction of the grid which starts immune
+        measurements: number of measurement sweeps at each p1
+        precision: spacing of p1
+        equilibrate: number of sweeps to perform before measuring
+        workers: number of worker processes, defaults to the number of cores
+        progress: optional function called with (done, total, (p1,)) as each point completes
+        adaptive: whether to stop equilibrating and measuring each point early, see SIRS.measure_infections
+        target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+        pool: TaskPool to run on, defaults to the shared pool of workers processes
+        seed: root seed of the random numbers, fresh entropy if not given. The same seed repeats the measurement
+        vectorised: whether to sweep with the vectorised sequential update, see CellularAutomata.batched_sweep
+    Returns:
+        p1 of each point, the variance and its error
+    """
+    size = shape[0] * shape[1]
+    p1s = np.round(np.arange(0.2, 0.5, precision), 3)
+    p2 = 0.5
+    p3 = 0.5
+    # completed points are kept until the output is written, so an interrupted run only measures the missing ones
+    # when restarted
+    checkpoint = Checkpoint(os.path.join("checkpoints", f"SIRSVar_{shape[0]}x{shape[1]}_{f_immune}_{measurements}_"
+                                                        f"{equilibrate}{_mode(adaptive, target_error, vectorised)}"))
+    missing = checkpoint.missing([(p1,) for p1 in p1s])
+    var = []
+    error = []
+    # one seed for each point whether or not it is missing, and the last for the bootstrap
+    point_seeds = seeds(len(p1s) + 1, checkpoint.seed(seed))
+    specs = [spec('infections', point_seeds[list(p1s).index(p1)], shape=shape, p=(p1, p2, p3), f_immune=f_immune,
+                  equilibrate=equilibrate, measurements=measurements, adaptive=adaptive, target_error=target_error,
+                  vectorised=vectorised)
+             for p1, in missing]
+    done = len(p1s) - len(missing)
+    for _, (inf, p1, _, _) in (pool or shared_pool(workers)).run(specs):
+        done += 1
+        checkpoint.save((p1,), inf)
+        _report(progress, done, len(p1s), (p1,))
+    rng = np.random.default_rng(point_seeds[-1])
+    for p1 in p1s:
+        inf = checkpoint.load((p1,))
+        av_inf = np.mean(inf)
+        av_inf_squared = np.mean(np.power(inf, 2))
+        var.append(round((av_inf_squared-av_inf)/size, 3))
+        # calculate errors using bootstrap method and 1000 resamples
+        error.append(round(bootstrap(inf, partial(infected_variance, size=size), 1000, rng=rng), 3))
+    out = ','.join(map(str, p1s))+'\n'
+    out += ','.join(map(str, var))+'\n'
+    out += ','.join(map(str, error))
+    atomic_write("SIRSVar.txt", out)
+    checkpoint.clear()
+    return p1s, var, error
+
+
+def _measure_phase_points(shape, points, p2, f_immune, equilibrate, measurements, checkpoint, sweeps, workers=None,
+                          progress=None, adaptive=False, target_error=1e-3, pool=None, seed=None, census=None):
+    """
+    Measures the (p1, p3) points missing from a checkpoint with ensembles spread across a pool, saving the number
+    of infected at each measurement to checkpoint and the number of sweeps performed to sweeps. If a census
+    checkpoint is given the number of every state at each measurement is saved to it too, and points measured
+    without one are measured again. Each ensemble is seeded from seed, so the results repeat for the same seed,
+    checkpoint and number of workers
+    """
+    missing = checkpoint.missing(points)
+    if census is not None:
+        absent = set(missing) | set(census.missing(points))
+        missing = [point for point in points if point in absent]
+    pool = pool or shared_pool(workers)
+    # each task advances a whole chunk of points as one ensemble, several chunks per worker for progress
+    chunks = chunk(missing, pool.workers * pool.batches_per_worker)
+    specs = [spec('ensemble', s, shape=shape, points=c, p2=p2, f_immune=f_immune, equilibrate=equilibrate,
+                  measurements=measurements, adaptive=adaptive, target_error=target_error, census=census is not None)
+             for c, s in zip(chunks, seeds(len(chunks), seed))]
+    done = len(points) - len(missing)
+    for _, results in pool.run(specs):
+        for inf, p1, p3, s, *states in results:
+            done += 1
+            # the sweeps and census of a point are saved before its measurements so every completed point has them
+            sweeps.save((p1, p3), s)
+            if census is not None:
+                census.save((p1, p3), states[0])
+            checkpoint.save((p1, p3), inf)
+        _report(progress, done, len(points), (p1, p3))
+
+
+def phase_diagram(shape, f_immune, measurements, precision, p2=0.5, equilibrate=100, workers=None, progress=None,
+                  adaptive=False, target_error=1e-3, pool=None, seed=None, census=False):
+    """
+    Measures the infected population and its variance over p1 and p3 from 0 to 1, written to SIRSResults
+    Args:
+        shape: the size of the grid
+        f_immune: fraction of the grid which starts immune
+        measurements: number of measurement sweeps at each point
+        precision: spacing of p1 and p3
+        p2: Probability I->R for every point
+        equilibrate: number of sweeps to perform before measuring
+        workers: number of worker processes, defaults to the number of cores
+        progress: optional function called with (done, total, (p1, p3)) as each point completes
+        adaptive: whether to stop equilibrating and measuring each point early, see SIRSEnsemble.measure_infections
+        target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+        pool: TaskPool to run on, defaults to the shared pool of workers processes
+        seed: root seed of the random numbers, fresh entropy if not given. The same seed repeats the measurement
+              with the same number of workers
+        census: whether to also store the number of cells in every state at each measurement
+    Returns:
+        the results store, including the number of sweeps performed at each point
+    """
+    p1s = np.round(np.arange(0, 1, precision), 3)
+    p3s = np.round(np.arange(0, 1, precision), 3)
+    size = shape[0] * shape[1]
+    points = [(p1, p3) for p1 in p1s for p3 in p3s]
+    # completed points are kept until the output is written, so an interrupted run only measures the missing ones
+    # when restarted
+    checkpoint = Checkpoint(os.path.join("checkpoints", f"SIRS_{shape[0]}x{shape[1]}_{p2}_{f_immune}_{measurements}_"
+                                                        f"{equilibrate}{_mode(adaptive, target_error)}"))
+    sweeps = Checkpoint(os.path.join(checkpoint.directory, "sweeps"))
+    states = Checkpoint(os.path.join(checkpoint.directory, "census")) if census else None
+    _measure_phase_points(shape, points, p2, f_immune, equilibrate, measurements, checkpoint, sweeps, workers,
+                          progress, adaptive, target_error, pool, checkpoint.seed(seed), states)
+    p1, p3 = np.transpose(points)
+    store = save_phase_diagram("SIRSResults", p1, p3, [checkpoint.load(point) for point in points], size,
+                               [sweeps.load(point) for point in points],
+                               [states.load(point) for point in points] if census else None)
+    checkpoint.clear()
+    return store
+
+
+def refined_phase_diagram(shape, f_immune, measurements, precision=0.0125, coarse=0.1, threshold=0.05, p2=0.5,
+                          equilibrate=100, workers=None, progress=None, adaptive=False, target_error=1e-3,
+                          pool=None, seed=None, census=False):
+    """
+    Measures the infected population and its variance over p1 and p3 from 0 to 1, starting from a coarse grid and
+    repeatedly halving the spacing only in the cells where the results change sharply between corners, e.g. near
+    the absorbing boundary. The scattered points are written to SIRSResults
+    Args:
+        shape: the size of the grid
+        f_immune: fraction of the grid which starts immune
+        measurements: number of measurement sweeps at each point
+        precision: smallest spacing of the points
+        coarse: spacing of the starting grid
+        threshold: a cell is refined if the infected fraction differs by more than this across its corners, or the
+                   variance by more than this fraction of the largest variance measured
+        p2: Probability I->R for every point
+        equilibrate: number of sweeps to perform before measuring
+        workers: number of worker processes, defaults to the number of cores
+        progress: optional function called with (done, total, (p1, p3)) as each point of a level completes
+        adaptive: whether to stop equilibrating and measuring each point early, see SIRSEnsemble.measure_infections
+        target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+        pool: TaskPool to run on, defaults to the shared pool of workers processes
+        seed: root seed of the random numbers, fresh entropy if not given. The same seed repeats the measurement
+              with the same number of workers
+        census: whether to also store the number of cells in every state at each measurement
+    Returns:
+        the results store
+    """
+    size = shape[0] * shape[1]
+    checkpoint = Checkpoint(os.path.join("checkpoints", f"SIRSRefined_{shape[0]}x{shape[1]}_{p2}_{f_immune}_"
+                                                        f"{measurements}_{equilibrate}{_mode(adaptive, target_error)}"))
+    sweeps = Checkpoint(os.path.join(checkpoint.directory, "sweeps"))
+    states = Checkpoint(os.path.join(checkpoint.directory, "census")) if census else None
+    n = int(round(1 / coarse))
+    h = 1 / n
+    # cells are squares of side h given by their lowest corner
+    cells = [(i * h, j * h) for i in range(n) for j in range(n)]
+    results = {}
+    # every level of refinement has its own seed so no two ensembles share a stream
+    root = checkpoint.seed(seed)
+    while cells:
+        corners = {_corner(x + dx, y + dy) for x, y in cells for dx in (0, h) for dy in (0, h)}
+        new = sorted(corners - set(results))
+        _measure_phase_points(shape, new, p2, f_immune, equilibrate, measurements, checkpoint, sweeps, workers,
+                              progress, adaptive, target_error, pool, seeds(1, root)[0], states)
+        for point in new:
+            inf = checkpoint.load(point)
+            av_inf = np.mean(inf)
+            results[point] = (av_inf / size, (np.mean(np.power(inf, 2)) - av_inf) / size)
+        if h / 2 < precision * (1 - 1e-9):
+            break
+        max_var = max(max(var for _, var in results.values()), 1e-12)
+        refine = []
+        for x, y in cells:
+            val, var = np.transpose([results[_corner(x + dx, y + dy)] for dx in (0, h) for dy in (0, h)])
+            if np.ptp(val) > threshold or np.ptp(var) / max_var > threshold:
+                refine.append((x, y))
+        h /= 2
+        cells = [(x + dx, y + dy) for x, y in refine for dx in (0, h) for dy in (0, h)]
+    points = sorted(results)
+    p1, p3 = np.transpose(points)
+    store = save_phase_diagram("SIRSResults", p1, p3, [checkpoint.load(point) for point in points], size,
+                               [sweeps.load(point) for point in points],
+                               [states.load(point) for point in points] if census else None)
+    checkpoint.clear()
+    return store
+
+
+def _corner(p1, p3):
+    """
+    Key of a point of the refined grid, rounded so the same point reached from different cells is equal
+    """
+    return round(p1, 9), round(p3, 9)
+
+
+def immunity(shape, p1, p2, p3, runs, measurements, precision, equilibrate=100, workers=None, progress=None,
+             adaptive=False, target_error=1e-3, pool=None, seed=None, vectorised=False):
+    """
+    Measures how the infected population changes with the fraction immunised, written to Immune(p1,p2,p3).txt
+    Args:
+        shape: the size of the grid
+        p1: Probability S->I
+        p2: Probability I->R
+        p3: Probability R->S
+        runs: number of runs at each fraction immunised
+        measurements: number of measurement sweeps of each run
+        precision: spacing of the fraction immunised
+        equilibrate: number of sweeps to perform before measuring
+        workers: number of worker processes, defaults to the number of cores
+        progress: optional function called with (done, total, (f_immune, run)) as each run completes
+        adaptive: whether to stop equilibrating and measuring each run early, see SIRS.measure_infections
+        target_error: standard error of the mean infected fraction to stop measuring at when adaptive
+        pool: TaskPool to run on, defaults to the shared pool of workers processes
+        seed: root seed of the random numbers, fresh entropy if not given. The same seed repeats the measurement
+        vectorised: whether to sweep with the vectorised sequential update, see CellularAutomata.batched_sweep
+    Returns:
+        the fractions immunised, the average number infected and its standard error
+    """
+    f_immune = np.arange(0, 1, precision)
+    # completed runs are kept until the output is written, so an interrupted measurement only performs the missing
+    # ones when restarted
+    checkpoint = Checkpoint(os.path.join("checkpoints", f"Immune({p1},{p2},{p3})_{shape[0]}x{shape[1]}_"
+                                                        f"{measurements}_{equilibrate}"
+                                                        f"{_mode(adaptive, target_error, vectorised)}"))
+    keys = [(f, run) for f in f_immune for run in range(runs)]
+    missing = checkpoint.missing(keys)
+    infs = []
+    errors = []
+    # one seed for each run whether or not it is missing
+    run_seeds = dict(zip(keys, seeds(len(keys), checkpoint.seed(seed))))
+    specs = [spec('infections', run_seeds[key], key, shape=shape, p=(p1, p2, p3), f_immune=key[0],
+                  equilibrate=equilibrate, measurements=measurements, adaptive=adaptive, target_error=target_error,
+                  vectorised=vectorised)
+             for key in missing]
+    done = len(keys) - len(missing)
+    for s, result in (pool or shared_pool(workers)).run(specs):
+        checkpoint.save(s['key'], result[0])
+        done += 1
+        _report(progress, done, len(keys), s['key'])
+    for f in f_immune:
+        x = [np.mean(checkpoint.load((f, run))) for run in range(runs)]
+        infs.append(np.mean(x))
+        # a single run has no spread between runs so the error comes from the correlated measurements of the run
+        errors.append(sem(x) if runs > 1 else blocking(checkpoint.load((f, 0))))
+    out = ','.join(map(str, f_immune))+'\n'
+    out += ','.join((map(str, infs)))+'\n'
+    out += ','.join((map(str, errors)))
+    atomic_write(f"Immune({p1},{p2},{p3}).txt", out)
+    checkpoint.clear()
+    return f_immune, infs, errors
+
+
+def _print_progress(done, total, key):
+    print(f"Completed {done}/{total} measurements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('measurement', nargs='?',
+                        choices=['equilibrium', 'speed', 'variance', 'phase', 'refine', 'immune'])
+    parser.add_argument('--config', help="JSON file of options")
+    parser.add_argument('--size', type=int, nargs=2, default=[50, 50], metavar=('X', 'Y'), help="grid size")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, defaults to the number of cores")
+    parser.add_argument('--sweeps', type=int, default=100,
+                        help="measurement sweeps, or grids for equilibrium and steps for speed")
+    parser.add_argument('--equilibrate', type=int, default=100, help="sweeps to perform before measuring")
+    parser.add_argument('--precision', type=float, default=0.02,
+                        help="spacing of the varied probabilities, the smallest spacing for refine")
+    parser.add_argument('--coarse', type=float, default=0.1, help="starting spacing of refine")
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help="change across a cell which refine refines, as a fraction")
+    parser.add_argument('--f-immune', type=float, default=0, help="fraction immune for variance and phase")
+    parser.add_argument('--p1', type=float, default=0.5)
+    parser.add_argument('--p2', type=float, default=0.5)
+    parser.add_argument('--p3', type=float, default=0.5)
+    parser.add_argument('--runs', type=int, default=1, help="runs at each fraction immune")
+    parser.add_argument('--exact', action='store_true',
+                        help="equilibrium measures the exact step each grid reaches a fixed point or cycle")
+    parser.add_argument('--seed', type=int, default=None, help="seed to repeat a measurement exactly")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="stop equilibrating once stationary and measuring once the error reaches --target-error, "
+                             "treating --equilibrate and --sweeps as maxima")
+    parser.add_argument('--target-error', type=float, default=1e-3,
+                        help="standard error of the mean infected fraction to stop at when adaptive")
+    parser.add_argument('--vectorised', action='store_true',
+                        help="variance and immune sweep with the vectorised sequential update")
+    parser.add_argument('--census', action='store_true',
+                        help="phase and refine also store the number of cells in every state at each sweep")
+    args, _ = parser.parse_known_args()
+    if args.config:
+        with open(args.config) as infile:
+            config = json.load(infile)
+        parser.set_defaults(**{k.replace('-', '_'): v for k, v in config.items()})
+    args = parser.parse_args()
+    if args.measurement is None:
+        parser.error("a measurement must be given on the command line or in the config file")
+    shape = tuple(args.size)
+    if args.measurement == 'equilibrium':
+        equilibrium(shape, args.sweeps, args.workers, _print_progress, seed=args.seed, exact=args.exact)
+    elif args.measurement == 'speed':
+        print(glider_speed(shape, args.sweeps))
+    elif args.measurement == 'variance':
+        variance(shape, args.f_immune, args.sweeps, args.precision, args.equilibrate, args.workers, _print_progress,
+                 args.adaptive, args.target_error, seed=args.seed, vectorised=args.vectorised)
+    elif args.measurement in ('phase', 'refine'):
+        if args.measurement == 'phase':
+            store = phase_diagram(shape, args.f_immune, args.sweeps, args.precision, args.p2, args.equilibrate,
+                                  args.workers, _print_progress, args.adaptive, args.target_error, seed=args.seed,
+                                  census=args.census)
+        else:
+            store = refined_phase_diagram(shape, args.f_immune, args.sweeps, args.precision, args.coarse,
+                                          args.threshold, args.p2, args.equilibrate, args.workers, _print_progress,
+                                          args.adaptive, args.target_error, seed=args.seed, census=args.census)
+        print(f"Measured {len(store)} points")
+        used = int(np.sum(store['equilibrate_sweeps']) + np.sum(store['measure_sweeps']))
+        print(f"Performed {used} of at most {len(store) * (args.equilibrate + args.sweeps)} sweeps")
+    else:
+        immunity(shape, args.p1, args.p2, args.p3, args.runs, args.sweeps, args.precision, args.equilibrate,
+                 args.workers, _print_progress, args.adaptive, args.target_error, seed=args.seed,
+                 vectorised=args.vectorised)
+
+
+if __name__ == "__main__":
+    main()
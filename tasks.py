@@ -0,0 +1,154 @@
+"""
+Tasks for the measurement pools. A task is a small dict giving the name of the task, its parameters and a seed,
+and the worker constructs the grid itself, so only the parameters are sent to the worker rather than a whole
+automaton. Tasks are sent to a warm pool in batches, one batch per message. Each task seeds its automaton with its
+own SeedSequence, so the results don't depend on which worker runs it and a sweep can be repeated from its seed.
+"""
+import os
+import atexit
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from GameOfLife import GameOfLife
+from SIRS import SIRS
+from Ensemble import GameOfLifeEnsemble, measure_points, chunk
+
+
+def _infections(shape, p, f_immune, equilibrate, measurements, adaptive=False, target_error=1e-3, census=False,
+                vectorised=False, seed=None):
+    S = SIRS(shape, *p, seed=seed)
+    S.randomise(f_immune)
+    return S.measure_infections(equilibrate, measurements, vectorised, adaptive=adaptive, target_error=target_error,
+                                census=census)
+
+
+def _equilibrium(shape, exact=False, seed=None):
+    G = GameOfLife(shape, seed=seed)
+    G.randomise()
+    return G.find_equilibrium(1, 1, exact=exact)
+
+
+def _life_ensemble(shape, boards, exact=False, seed=None):
+    E = GameOfLifeEnsemble(shape, boards, seed=seed)
+    E.randomise()
+    return [None if s < 0 else int(s) for s in E.find_equilibrium(exact=exact)]
+
+
+def _ensemble(shape, points, p2, f_immune, equilibrate, measurements, adaptive=False, target_error=1e-3, census=False,
+              seed=None):
+    return measure_points(shape, points, p2, f_immune, equilibrate, measurements, adaptive, target_error, seed,
+                          census)
+
+
+# name of each task and the function run for it
+TASKS = {'infections': _infections, 'equilibrium': _equilibrium, 'life_ensemble': _life_ensemble,
+         'ensemble': _ensemble}
+
+
+def spec(task, seed=None, key=None, **params):
+    """
+    Creates the spec of a task
+    Args:
+        task: name of the task in TASKS
+            'infections': one SIRS.measure_infections, params shape, p=(p1, p2, p3), f_immune, equilibrate,
+                          measurements and optionally adaptive, target_error, census and vectorised
+            'equilibrium': steps a random Game of Life grid takes to reach equilibrium, params shape and optionally
+                           exact
+            'life_ensemble': as 'equilibrium' for many random grids advanced together as one
+                             Ensemble.GameOfLifeEnsemble, params shape, boards and optionally exact
+            'ensemble': an Ensemble.measure_points of many (p1, p3) points, params as measure_points
+        seed: SeedSequence (or int) seeding the task's automaton, usually one of seeds. Fresh entropy if not given
+        key: optional label for the caller to identify the result by, not used by the task
+        params: parameters of the task
+    """
+    if task not in TASKS:
+        raise ValueError(f"Unknown task {task}, expected one of {list(TASKS)}")
+    if seed is None:
+        seed = np.random.SeedSequence()
+    return dict(params, task=task, seed=seed, key=key)
+
+
+def seeds(n, seed=None):
+    """
+    Independent seeds for n tasks spawned from one root, the same for the same root seed
+    Args:
+        n: number of seeds
+        seed: int seed or SeedSequence of the root, or None for fresh entropy
+    Returns:
+        list of SeedSequence
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(n)
+
+
+def run_task(spec):
+    """
+    Runs a single task in the current process
+    """
+    params = {k: v for k, v in spec.items() if k not in ('task', 'key')}
+    return TASKS[spec['task']](**params)
+
+
+def run_batch(specs):
+    """
+    Runs a batch of tasks in a worker, returning their results in order
+    """
+    return [run_task(s) for s in specs]
+
+
+class TaskPool:
+    """
+    Pool of worker processes kept warm between sweeps. Tasks are given as specs and sent in batches, several per
+    worker so the progress can still be followed
+    Args:
+        workers: number of worker processes, defaults to the number of cores
+        batches_per_worker: number of batches the tasks of a run are split into for each worker
+    """
+
+    def __init__(self, workers=None, batches_per_worker=4):
+        self.workers = workers or os.cpu_count()
+        self.batches_per_worker = batches_per_worker
+        self._executor = ProcessPoolExecutor(self.workers)
+
+    def run(self, specs):
+        """
+        Runs tasks across the pool
+        Args:
+            specs: list of task specs from spec
+        Returns:
+            generator of (spec, result) for every task, in the order their batches complete
+        """
+        futures = {self._executor.submit(run_batch, batch): batch
+                   for batch in chunk(list(specs), self.workers * self.batches_per_worker)}
+        for f in as_completed(futures):
+            yield from zip(futures[f], f.result())
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+_pools = {}
+
+
+def shared_pool(workers=None):
+    """
+    Returns a pool of the given number of workers which is shared by every sweep of the process, started the first
+    time it is needed
+    """
+    workers = workers or os.cpu_count()
+    if workers not in _pools:
+        _pools[workers] = TaskPool(workers)
+    return _pools[workers]
+
+
+@atexit.register
+def _close_pools():
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
@@ -0,0 +1,37 @@
+import os
+import stat
+import numpy as np
+import pytest
+from Checkpoint import Checkpoint, atomic_write, FILE_MODE
+
+
+def test_resumes_with_recorded_seed(tmp_path):
+    first = Checkpoint(str(tmp_path / "sweep")).seed()
+    resumed = Checkpoint(str(tmp_path / "sweep")).seed()
+    assert resumed.entropy == first.entropy
+    assert np.array_equal(resumed.generate_state(4), first.generate_state(4))
+
+
+def test_refuses_another_seed(tmp_path):
+    C = Checkpoint(str(tmp_path / "sweep"))
+    C.seed(1)
+    assert C.seed(1).entropy == 1
+    with pytest.raises(ValueError):
+        C.seed(2)
+
+
+def test_clear(tmp_path):
+    C = Checkpoint(str(tmp_path / "sweep"))
+    C.seed(1)
+    C.save((0.5, 1), np.arange(3))
+    assert C.missing([(0.5, 1), (0.5, 2)]) == [(0.5, 2)]
+    C.clear()
+    assert Checkpoint(str(tmp_path / "sweep")).seed(2).entropy == 2
+
+
+def test_atomic_write_permissions(tmp_path):
+    path = str(tmp_path / "out.txt")
+    atomic_write(path, "a")
+    assert stat.S_IMODE(os.stat(path).st_mode) == FILE_MODE
+    with open(path) as infile:
+        assert infile.read() == "a"
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from Grid import Grid
+from GameOfLife import GameOfLife
+from BitLife import BitGameOfLife
+from SIRS import SIRS
+from Ensemble import SIRSEnsemble
+
+
+@pytest.fixture(autouse=True)
+def check_counts(monkeypatch):
+    # every count and counts raises if the running counts differ from a recount of the grid
+    monkeypatch.setattr(Grid, 'check_counts', True)
+
+
+def check(grid):
+    counts = grid.counts()
+    for actor in grid.actors:
+        assert grid.count(actor) == counts[actor]
+
+
+def test_game_of_life():
+    G = GameOfLife((40, 40), seed=1)
+    G.randomise()
+    for _ in range(20):
+        G.update(1)
+        check(G)
+    G[5:10, 5:10] = 1
+    G.glider()
+    check(G)
+
+
+def test_tiled():
+    G = GameOfLife((40, 40), seed=2)
+    G.randomise()
+    G.enable_tiles(8)
+    for _ in range(50):
+        G.update(1)
+        check(G)
+
+
+def test_bit_packed():
+    B = BitGameOfLife((40, 70), seed=3)
+    B.randomise()
+    B.update()
+    assert np.array_equal(B.counts(), np.bincount(B.array.ravel(), minlength=2))
+    check(B)
+
+
+@pytest.mark.parametrize('vectorised', [False, True])
+def test_sirs_sequential(vectorised):
+    S = SIRS((20, 20), 0.5, 0.5, 0.5, seed=4)
+    S.randomise(0.1)
+    for _ in range(5):
+        S.sequential_update(S.actors[2], vectorised=vectorised)
+        check(S)
+
+
+def test_sirs_synchronous():
+    S = SIRS((20, 20), 0.5, 0.5, 0.5, seed=5)
+    S.randomise(0.1)
+    S.update(S.actors[2])
+    check(S)
+
+
+def test_sirs_census():
+    S = SIRS((20, 20), 0.5, 0.5, 0.5, seed=6)
+    S.randomise(0)
+    infected, _, _, _, census = S.measure_infections(5, 20, census=True)
+    measured = ~np.isnan(census[:, 0])
+    assert np.array_equal(census[measured, S.actors[2]], infected[measured])
+    assert np.all(census[measured].sum(axis=1) == S.size)
+
+
+def test_ensemble_census():
+    E = SIRSEnsemble((20, 20), [0.5, 0.8], 0.5, [0.5, 0.1], seed=7)
+    E.randomise(0)
+    E.sweep()
+    census = E.census()
+    for replica, counts in zip(E._array, census):
+        assert np.array_equal(counts, np.bincount(replica.ravel(), minlength=census.shape[1]))
+    assert np.array_equal(census[:, E.actors[2]], E.count(E.actors[2]))
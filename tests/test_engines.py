@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from GameOfLife import GameOfLife
+from HashLife import HashLife
+from BitLife import BitGameOfLife
+
+RULES = ["B3/S23", "B36/S23", "B0/S8"]
+# power of two squares are tiled inside the quadtree, other shapes as an array, and the widths not a multiple of 64
+# leave part of the last word of each row unused
+SHAPES = [(32, 32), (64, 64), (50, 40), (20, 70), (16, 130)]
+
+
+def soup(shape, rule, seed=0):
+    G = GameOfLife(shape, rule=rule, seed=seed)
+    G.randomise()
+    return G
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('rule', RULES)
+@pytest.mark.parametrize('generations', [1, 7, 32])
+def test_hashlife_matches_dense(rule, shape, generations):
+    G = soup(shape, rule)
+    H = HashLife.from_grid(G)
+    H.advance(generations)
+    for _ in range(generations):
+        G.update(1)
+    assert H.generation == generations
+    assert np.array_equal(H.array, G.array)
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('rule', RULES)
+def test_bit_packed_matches_dense(rule, shape):
+    G = soup(shape, rule)
+    B = BitGameOfLife.from_grid(G)
+    for _ in range(20):
+        G.update(1)
+        B.update()
+        assert np.array_equal(B.array, G.array)
+    assert B.count(1) == G.count(1)
+
+
+def test_glider_speed():
+    assert np.isclose(GameOfLife((32, 32)).glider_speed(256), np.sqrt(2) / 4)
+    assert np.isclose(GameOfLife((20, 30)).glider_speed(100), np.sqrt(2) / 4)
+
+
+def test_bit_packed_rejects_sequential_updates():
+    B = BitGameOfLife((20, 70), seed=1)
+    B.randomise()
+    for vectorised in (False, True):
+        with pytest.raises(ValueError):
+            B.sequential_update(1, vectorised=vectorised)
+    with pytest.raises(ValueError):
+        B.batched_sweep(1)
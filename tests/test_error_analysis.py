@@ -0,0 +1,21 @@
+import numpy as np
+from scipy.stats import sem
+from error_analysis import jackknife, blocking
+
+
+def test_jackknife_keeps_the_whole_series():
+    series = np.r_[np.zeros(20), np.ones(19)]
+    assert np.isclose(jackknife(series), sem(series))
+
+
+def test_jackknife_of_iid_mean_matches_sem():
+    series = np.random.default_rng(0).normal(size=39)
+    # 39 samples in 20 blocks are blocks of one, which is the ordinary jackknife
+    assert np.isclose(jackknife(series), sem(series))
+    series = np.random.default_rng(1).normal(size=1003)
+    assert np.isclose(jackknife(series), sem(series), rtol=0.3)
+
+
+def test_blocking_of_iid_mean_matches_sem():
+    series = np.random.default_rng(2).normal(size=1003)
+    assert np.isclose(blocking(series), sem(series), rtol=0.3)
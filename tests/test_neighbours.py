@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy.ndimage import convolve
+from NeighbourCounter import NeighbourCounter, MOORE, VON_NEUMANN
+
+square = np.ones((5, 5), dtype=int)
+square[2, 2] = 0
+KERNELS = {
+    'moore': MOORE,
+    'von_neumann': VON_NEUMANN,
+    'even': np.array([[1, 2], [3, 4]]),
+    'negative': np.array([[1, -1, 1], [-2, 0, -2], [1, -1, 1]]),
+    'float': np.array([[0.5, 1, 0.5], [1, 0, 1], [0.5, 1, 0.5]]),
+    'separable_without_centre': square,
+    'larger_than_grid': np.arange(1, 26).reshape(5, 5) % 3,
+    'wrapping_more_than_once': np.arange(81).reshape(9, 9) % 4,
+}
+
+
+@pytest.mark.parametrize('shape', [(8, 8), (13, 7), (3, 4)])
+@pytest.mark.parametrize('kernel', KERNELS)
+@pytest.mark.parametrize('method', NeighbourCounter.methods)
+def test_matches_convolve(method, kernel, shape):
+    weight = KERNELS[kernel]
+    try:
+        counter = NeighbourCounter(shape, weight, method)
+    except ValueError:
+        pytest.skip(f"{method} can't count {kernel} on {shape}")
+    array = np.random.default_rng(0).integers(3, size=shape)
+    expected = convolve((array == 1).astype(weight.dtype), weight, mode='wrap')
+    assert np.allclose(counter.count(array, 1), expected)
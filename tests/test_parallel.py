@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from GameOfLife import GameOfLife
+from ParallelUpdate import ParallelUpdate
+
+
+def test_matches_update():
+    G = GameOfLife((64, 64), seed=1)
+    G.randomise()
+    with G.parallel(1, workers=2) as P:
+        P.update(5)
+        for _ in range(5):
+            G.update(1)
+        assert np.array_equal(P.array, G.array)
+
+
+def test_rejects_larger_weights():
+    G = GameOfLife((64, 64))
+    with pytest.raises(ValueError):
+        G.parallel(1, np.ones((5, 5), dtype=int), workers=2)
+
+
+def test_worker_failure_raises():
+    G = GameOfLife((64, 64), seed=1)
+    G.randomise()
+    # too few neighbour counts in the table, so the workers fail to index it
+    P = ParallelUpdate(G.array, np.zeros((2, 3), dtype=np.uint8), 1, workers=2, timeout=60)
+    with pytest.raises(RuntimeError):
+        P.update(1)
+    P.close()
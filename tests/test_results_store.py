@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from ResultsStore import ResultsStore
+
+COLUMNS = {'p': ('f8', ()), 'series': ('f4', (3,)), 'n': ('i8', ())}
+
+
+def test_store_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    p = rng.random(9)
+    series = rng.random((9, 3)).astype('f4')
+    S = ResultsStore(str(tmp_path), COLUMNS, capacity=2)
+    for i in range(3):
+        S.append(p=p[i], series=series[i], n=i)
+    # a batch past the capacity
+    S.append(p=p[3:7], series=series[3:7], n=np.arange(3, 7))
+    assert len(S) == 7
+    S = ResultsStore(str(tmp_path), COLUMNS)
+    S.append(p=p[7:], series=series[7:], n=np.arange(7, 9))
+    S = ResultsStore(str(tmp_path))
+    assert len(S) == 9
+    assert np.array_equal(S['p'], p)
+    assert np.array_equal(S['series'], series)
+    assert np.array_equal(S['n'], np.arange(9))
+    with pytest.raises(ValueError):
+        ResultsStore(str(tmp_path), {'p': ('f8', ())})
+
+
+def test_store_counts_rows_after_their_data(tmp_path, monkeypatch):
+    S = ResultsStore(str(tmp_path), COLUMNS, capacity=2)
+    S.append(p=0.5, series=np.ones(3), n=1)
+    mapped = ResultsStore._map
+
+    def fail(self, name, mode='r'):
+        if name == 'n' and mode == 'r+':
+            raise OSError("interrupted")
+        return mapped(self, name, mode)
+
+    # the append is interrupted after writing some of the columns, past the capacity so the files grow first
+    monkeypatch.setattr(ResultsStore, '_map', fail)
+    with pytest.raises(OSError):
+        S.append(p=[0.1, 0.2], series=np.zeros((2, 3)), n=[2, 3])
+    monkeypatch.undo()
+    S = ResultsStore(str(tmp_path))
+    assert len(S) == 1
+    assert S['p'][0] == 0.5
+    S.append(p=0.1, series=np.zeros(3), n=2)
+    assert np.array_equal(S['n'], [1, 2])
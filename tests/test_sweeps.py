@@ -0,0 +1,16 @@
+import numpy as np
+from SIRS import SIRS
+
+
+def stationary_fraction(vectorised, seed=1):
+    """
+    Mean infected fraction of a SIRS grid in its active phase
+    """
+    S = SIRS((30, 30), 0.5, 0.5, 0.5, seed=seed)
+    S.randomise(0)
+    infected = S.measure_infections(50, 200, vectorised=vectorised)[0]
+    return np.mean(infected) / S.size
+
+
+def test_vectorised_matches_sequential():
+    assert abs(stationary_fraction(False) - stationary_fraction(True)) < 0.02
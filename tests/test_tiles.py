@@ -0,0 +1,57 @@
+import numpy as np
+from GameOfLife import GameOfLife
+from NeighbourCounter import VON_NEUMANN
+
+
+def pair(shape=(40, 40), seed=0):
+    """
+    A tiled grid and an untiled copy of it
+    """
+    tiled = GameOfLife(shape, seed=seed)
+    tiled.randomise()
+    full = GameOfLife(shape)
+    full._set_array(tiled.array.copy())
+    tiled.enable_tiles(8)
+    return tiled, full
+
+
+def test_tiled_matches_full():
+    tiled, full = pair()
+    for _ in range(50):
+        tiled.update(1)
+        full.update(1)
+        assert np.array_equal(tiled.array, full.array)
+
+
+def test_rule_change_reactivates_tiles():
+    tiled, full = pair()
+    for _ in range(200):
+        tiled.update(1)
+        full.update(1)
+    tiled.clear()
+    full.clear()
+    # a block is still under B3/S23 but dies under B3/S2
+    for G in (tiled, full):
+        G[10:12, 10:12] = 1
+        G.update(1)
+        G.update(1)
+    assert tiled.tile_stats['active'] == 0
+    tiled.rule = full.rule = "B3/S2"
+    tiled.update(1)
+    full.update(1)
+    assert full.count(1) == 0
+    assert np.array_equal(tiled.array, full.array)
+
+
+def test_weight_change_reactivates_tiles():
+    tiled, full = pair()
+    # a beehive is still in the Moore neighbourhood but not in the von Neumann one
+    for G in (tiled, full):
+        G.beehive()
+        G.update(1)
+        G.update(1)
+    assert tiled.tile_stats['active'] == 0
+    for G in (tiled, full):
+        G.update(1, VON_NEUMANN)
+    assert full.count(1) != 6
+    assert np.array_equal(tiled.array, full.array)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from Trajectory import Trajectory
+
+
+def run(count, shape=(6, 5), seed=0):
+    """
+    Frames of a grid with a few cells changing each step
+    """
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(3, size=shape).astype(np.uint8)
+    frames = []
+    for _ in range(count):
+        frame = frame.copy()
+        frame.flat[rng.integers(frame.size, size=3)] = rng.integers(3, size=3)
+        frames.append(frame)
+    return frames
+
+
+@pytest.mark.parametrize('mode', Trajectory.modes)
+def test_trajectory_round_trip(tmp_path, mode):
+    frames = run(40)
+    # a capacity smaller than the run so the files grow
+    with Trajectory(str(tmp_path), (6, 5), np.uint8, mode, keyframe=7, capacity=4) as T:
+        for frame in frames[:25]:
+            T.append(frame)
+    with Trajectory(str(tmp_path)) as T:
+        assert len(T) == 25
+        for frame in frames[25:]:
+            T.append(frame)
+    T = Trajectory(str(tmp_path))
+    assert len(T) == len(frames)
+    for i in (0, 6, 7, 8, 24, 25, -1):
+        assert np.array_equal(T[i], frames[i])
+    for start, stop in ((0, None), (3, 17), (7, 14), (13, 26), (39, 50), (20, 20)):
+        expected = frames[start:stop]
+        replayed = [frame.copy() for frame in T.frames(start, stop)]
+        assert len(replayed) == len(expected)
+        assert all(np.array_equal(a, b) for a, b in zip(replayed, expected))
+
+
+@pytest.mark.parametrize('mode', Trajectory.modes)
+def test_trajectory_counts_flushed_frames(tmp_path, mode):
+    frames = run(10)
+    T = Trajectory(str(tmp_path), (6, 5), np.uint8, mode, keyframe=4, capacity=2, sync=0)
+    for frame in frames[:6]:
+        T.append(frame)
+    T.flush()
+    for frame in frames[6:]:
+        T.append(frame)
+    # an interrupted run only sees the frames recorded by the last flush
+    resumed = Trajectory(str(tmp_path))
+    assert len(resumed) == 6
+    assert np.array_equal(resumed[-1], frames[5])